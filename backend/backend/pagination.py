@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination for per-user history endpoints
+
+Pages are cut on the queryset ordering, e.g. (timestamp, id), by filtering
+on the last row of the previous page instead of using OFFSET, so a deep
+page costs the same indexed range scan as the first one and rows inserted
+meanwhile never shift or repeat entries across pages.
+
+The response body stays a plain list; the next page is announced in a
+Link header (rel="next") carrying an opaque cursor. Pagination is opt-in:
+requests with neither page_size nor cursor get the whole list as before,
+since existing clients read these endpoints in full.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate a queryset on its ordering, which must end with a unique field
+
+    Only requests passing one of the query parameters are paginated.
+
+    Query parameters:
+    - cursor: Opaque position returned in the previous page's Link header
+    - page_size: Rows per page, capped at HISTORY_MAX_PAGE_SIZE
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-timestamp', '-id')
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'HISTORY_PAGE_SIZE', 100)
+        maximum = getattr(settings, 'HISTORY_MAX_PAGE_SIZE', 500)
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return min(default, maximum)
+        try:
+            page_size = int(value)
+        except ValueError:
+            raise ValidationError("page_size must be an integer")
+        if page_size < 1:
+            raise ValidationError("page_size must be positive")
+        return min(page_size, maximum)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            self.page_size_query_param not in request.query_params
+            and self.cursor_query_param not in request.query_params
+        ):
+            return None
+        self.request = request
+        self.ordering = tuple(queryset.query.order_by) or self.ordering
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        # One extra row tells whether another page follows
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = [field.value_to_string(page[-1]) for field in self.fields]
+        return page
+
+    def _after(self, position):
+        """Rows strictly after position in the ordering"""
+        condition = Q()
+        equal = {}
+        for name, field, value in zip(self.ordering, self.fields, position):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f"{field.name}__{lookup}": value})
+            equal[field.name] = value
+        # The redundant inclusive bound on the leading field lets the database
+        # seek the index to the cursor instead of filtering every earlier row
+        name, field, value = self.ordering[0], self.fields[0], position[0]
+        bound = Q(**{f"{field.name}__{'lte' if name.startswith('-') else 'gte'}": value})
+        return bound & condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(position, list) or len(position) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, position)]
+        except (ValueError, TypeError, binascii.Error, DjangoValidationError) as e:
+            raise ValidationError("Invalid cursor") from e
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        headers = {}
+        next_link = self.get_next_link()
+        if next_link is not None:
+            headers['Link'] = f'<{next_link}>; rel="next"'
+        return Response(data, headers=headers)
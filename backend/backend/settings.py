@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'image_api',
     'users',
     'food',
+    'sync',
 ]
 
 MIDDLEWARE = [
@@ -158,5 +159,50 @@ DJOSER = {
     'SERIALIZERS': {},
 }
 
+# Food catalog endpoints: Cache-Control max-age (seconds) for shared caches
+# and number of responses kept in each worker's LRU cache
+FOOD_CATALOG_CACHE_MAX_AGE = 300
+FOOD_RESPONSE_CACHE_SIZE = 2048
+
+# History endpoints (waterIntake, listFood, data/list): rows per page by
+# default and the most a client may request with ?page_size=
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Load and warm up the image model when a web process starts. Uploads are
+# predicted by run_inference_workers, which loads the model itself, so web
+# processes leave it unloaded (skipped anyway when best.pt or ultralytics
+# is missing)
+IMAGE_MODEL_PRELOAD = False
+
+# Image inference queue: idle worker poll interval and seconds before a job
+# left running by a dead worker is queued again (image_api/jobs.py)
+INFERENCE_JOB_POLL_INTERVAL = 0.5
+INFERENCE_JOB_STALE_AFTER = 300
+INFERENCE_JOB_MAX_ATTEMPTS = 3
+
+# Seconds between an inference worker's heartbeats, and without one after
+# which it no longer counts towards /image/ready/ (image_api/jobs.py)
+INFERENCE_WORKER_HEARTBEAT_INTERVAL = 10
+INFERENCE_WORKER_HEARTBEAT_TIMEOUT = 30
+
+# Micro-batching of concurrent image predictions in one process: most images
+# per model call and seconds a batch waits to fill (image_api/batching.py)
+INFERENCE_MAX_BATCH_SIZE = 8
+INFERENCE_MAX_BATCH_WAIT = 0.015
+
+# Uploads whose perceptual hash differs from an already predicted image by at
+# most this many of 64 bits reuse its prediction; predictions are kept in an
+# LRU cache of this many hashes per process (image_api/image_hash.py)
+IMAGE_HASH_MAX_DISTANCE = 4
+IMAGE_PREDICTION_CACHE_SIZE = 4096
+
+# Uploaded photos are stored re-encoded as JPEG with at most this longest side
+# and size, and handed to the model at its input size (image_api/uploads.py)
+IMAGE_STORE_MAX_SIDE = 1280
+IMAGE_STORE_QUALITY = 85
+IMAGE_STORE_MAX_BYTES = 512 * 1024
+IMAGE_MODEL_INPUT_SIZE = 224
+
 # Email backend for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Test helpers for checking that list endpoints stay on their indexes
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Plan steps that mean a query reads every row of a table or sorts its
+# result in a temporary B-tree instead of walking an index in order
+BAD_PLAN_STEPS = ('SCAN ', 'USE TEMP B-TREE')
+
+
+def explain_query_plan(sql):
+    """
+    Run EXPLAIN QUERY PLAN for a SELECT statement
+
+    Returns:
+    - List of the plan's detail lines, e.g. "SEARCH food_waterintake USING
+      INDEX water_user_timestamp_idx (user_id=?)"
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, table):
+    """Detail lines of the plan of sql that scan or sort table"""
+    return [
+        detail for detail in explain_query_plan(sql)
+        if any(detail.startswith(step) for step in BAD_PLAN_STEPS)
+        and (table in detail or 'TEMP B-TREE' in detail)
+    ]
+
+
+class QueryPlanAssertionsMixin:
+    """TestCase mixin asserting that captured queries are served by an index"""
+
+    @contextmanager
+    def assertIndexedQueries(self, table):
+        """
+        Fail if any SELECT from table run inside the block falls back to a
+        full table scan or a temporary B-tree sort
+
+        Only available on SQLite, whose EXPLAIN QUERY PLAN output is parsed.
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest("Query plan checks need SQLite")
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+
+        selects = [
+            query['sql'] for query in captured.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        ]
+        self.assertTrue(selects, f"No query read from {table}")
+        for sql in selects:
+            problems = plan_problems(sql, table)
+            self.assertFalse(problems, f"Unindexed plan {problems} for query: {sql}")
@@ -36,4 +36,5 @@ urlpatterns = [
     # API URLs
     path('users/', include('users.urls')),
     path('food/', include('food.urls')),
+    path('sync/', include('sync.urls')),
 ]
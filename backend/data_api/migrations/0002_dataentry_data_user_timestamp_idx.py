@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataentry',
+            index=models.Index(fields=['user', 'timestamp'], name='data_user_timestamp_idx'),
+        ),
+    ]
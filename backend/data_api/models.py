@@ -11,6 +11,11 @@ class DataEntry(models.Model):
     vitamins = models.DecimalField(max_digits=7, decimal_places=3)
     minerals = models.DecimalField(max_digits=7, decimal_places=3)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='data_user_timestamp_idx'),
+        ]
+
     def __str__(self):
         return f"DataEntry {self.id} - {self.timestamp}"
 
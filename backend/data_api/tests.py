@@ -1,3 +1,29 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from backend.testing import QueryPlanAssertionsMixin
+from .models import DataEntry
+
+
+class DataEntryQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """The date range list must walk the (user, timestamp) index, never scan or sort"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create(username=f'user{i}') for i in range(5)]
+        cls.user = users[0]
+        DataEntry.objects.bulk_create([
+            DataEntry(user=user, protein=1, carbs=1, fat=1, vitamins=1, minerals=1)
+            for user in users for _ in range(200)
+        ])
+
+    def test_data_entry_list(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertIndexedQueries('data_api_dataentry'):
+            response = client.get('/data/list/?start_date=2000-01-01T00:00:00Z&end_date=2100-01-01T00:00:00Z&page_size=20')
+            self.assertEqual(response.status_code, 200)
+            link = response['Link']
+            response = client.get(link[1:link.index('>')])
+            self.assertEqual(response.status_code, 200)
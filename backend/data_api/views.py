@@ -7,6 +7,7 @@ from .serializers import DataEntrySerializer
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
+from backend.pagination import KeysetPagination
 
 class DataEntryCreateView(generics.CreateAPIView):
 
@@ -23,6 +24,7 @@ class DataEntryCreateView(generics.CreateAPIView):
 class DataEntryListByDateView(generics.ListAPIView):
 
     serializer_class = DataEntrySerializer
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         start_date = self.request.query_params.get('start_date')
@@ -44,4 +46,7 @@ class DataEntryListByDateView(generics.ListAPIView):
         except (ValueError, TypeError):
             raise ValidationError("Invalid date format. Use YYYY-MM-DD or YYYY-MM-DDThh:mm:ss format")
         
-        return DataEntry.objects.filter(timestamp__gte=start_datetime, timestamp__lte=end_datetime)
\ No newline at end of file
+        return DataEntry.objects.filter(
+            user=self.request.user,
+            timestamp__gte=start_datetime, timestamp__lte=end_datetime
+        ).order_by('timestamp', 'id')
\ No newline at end of file
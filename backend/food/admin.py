@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import DailyGoal, WaterIntake, FoodConsumption
+from .models import DailyGoal, WaterIntake, FoodConsumption, DailyNutritionRollup
 
 admin.site.register(DailyGoal)
 admin.site.register(WaterIntake)
 admin.site.register(FoodConsumption)
+admin.site.register(DailyNutritionRollup)
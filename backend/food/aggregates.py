@@ -0,0 +1,59 @@
+"""
+Per-day nutrition totals, served from the DailyNutritionRollup table
+"""
+from datetime import timedelta
+
+from .models import DailyGoal, DailyNutritionRollup
+
+# Goals used when a user has not set any
+DEFAULT_DAILY_GOAL = {
+    'calories': 2000,
+    'protein': 50,
+    'carbohydrates': 250,
+    'fat': 70
+}
+
+NUTRIENT_TOTALS = ('calories', 'protein', 'carbohydrates', 'fat')
+
+
+def empty_totals():
+    totals = {field: 0 for field in NUTRIENT_TOTALS}
+    totals.update({'water': 0, 'items': 0})
+    return totals
+
+
+def daily_totals(user, start_day, end_day):
+    """
+    Per-day food and water totals of a user, read from the daily rollups
+
+    Costs one indexed query over at most one row per day, whatever the
+    number of entries logged.
+
+    Returns:
+    - Dictionary of date to totals ({'calories', 'protein', 'carbohydrates',
+      'fat', 'water', 'items'}) for every day from start_day to end_day
+    """
+    totals = {}
+    day = start_day
+    while day <= end_day:
+        totals[day] = empty_totals()
+        day += timedelta(days=1)
+
+    rollups = DailyNutritionRollup.objects.filter(
+        user=user, date__gte=start_day, date__lte=end_day
+    ).values('date', *NUTRIENT_TOTALS, 'water', 'items')
+    for row in rollups:
+        totals[row.pop('date')].update(row)
+    return totals
+
+
+def day_totals(user, day):
+    """Sum a user's food consumption over one local calendar day"""
+    totals = DailyNutritionRollup.objects.filter(user=user, date=day).values(*NUTRIENT_TOTALS, 'items').first()
+    return totals or {field: 0 for field in NUTRIENT_TOTALS + ('items',)}
+
+
+def goal_for(user):
+    """The user's daily goals as a dictionary, defaults when none are set"""
+    goal = DailyGoal.objects.filter(user=user).values(*NUTRIENT_TOTALS).first()
+    return goal or dict(DEFAULT_DAILY_GOAL)
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class FoodConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food'
+
+    def ready(self):
+        # Keep DailyNutritionRollup in step with food and water writes
+        from . import rollups  # noqa: F401
+        # and UserStreak in step with new entries
+        from . import streaks  # noqa: F401
+
+        # Load the food catalog once per process instead of on first request
+        from .food_data import get_catalog
+        try:
+            get_catalog()
+        except Exception as e:
+            print(f"Error loading food catalog: {e}")
@@ -0,0 +1,244 @@
+"""
+Compiled binary form of the catalog CSV files
+
+Layout (little-endian):
+- Preamble: magic, format version, row count, column count, numeric column
+  count and the SHA-256 of the source CSV
+- Positions (uint16) of the numeric columns
+- Numeric block: float64, one contiguous run of rows per numeric column,
+  NaN where the CSV cell is empty
+- String table: per-row start (uint32) into the cell offsets, cell offsets
+  (uint32) into the blob, then the UTF-8 blob holding every cell verbatim.
+  Row 0 of the string table is the CSV header.
+
+Readers memory-map the file read-only, so every worker process serving
+from the same file shares its pages.
+"""
+import csv
+import hashlib
+import io
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'CWCATLG\x00'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sIIII32s')
+ALIGNMENT = 8
+
+
+class CatalogFileError(Exception):
+    """Raised when a compiled catalog file is malformed"""
+
+
+def file_digest(path):
+    """SHA-256 digest of the file at path"""
+    with open(path, 'rb') as source:
+        return hashlib.sha256(source.read()).digest()
+
+
+def parse_csv(text):
+    """Return (header, rows) of catalog CSV text"""
+    reader = csv.reader(io.StringIO(text, newline=''))
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("CSV file is empty")
+    rows = list(reader)
+    return header, rows
+
+
+def read_csv(path):
+    """Return (header, rows) of a catalog CSV"""
+    with open(path, 'rb') as csv_file:
+        return parse_csv(csv_file.read().decode('utf-8'))
+
+
+def parse_float(value):
+    """Parse a CSV cell as a float, NaN when it is empty or not a number"""
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def column_cells(rows, j):
+    """Cell j of every row of a list of rows or MappedRows, None where missing"""
+    if isinstance(rows, MappedRows):
+        return rows.column(j)
+    return [row[j] if j < len(row) else None for row in rows]
+
+
+def row_cell(rows, position, j):
+    """Cell j of the row at position, None where the row is too short"""
+    if isinstance(rows, MappedRows):
+        return rows.cell(position, j) if j < rows.width(position) else None
+    row = rows[position]
+    return row[j] if j < len(row) else None
+
+
+def _pad(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def compile_csv(csv_path, output_path, text_columns):
+    """
+    Compile the CSV at csv_path into a binary catalog at output_path
+
+    Columns named in text_columns are kept only in the string table; every
+    other column is also stored in the numeric block.
+
+    Returns:
+    - Number of data rows written
+    """
+    with open(csv_path, 'rb') as csv_file:
+        data = csv_file.read()
+    digest = hashlib.sha256(data).digest()
+    header, rows = parse_csv(data.decode('utf-8'))
+    names = [name.lstrip('\ufeff') for name in header]
+    numeric = [j for j, name in enumerate(names) if name not in text_columns]
+
+    values = np.full((len(numeric), len(rows)), np.nan, dtype='<f8')
+    for k, j in enumerate(numeric):
+        values[k] = [parse_float(row[j]) if j < len(row) else np.nan for row in rows]
+
+    blob = bytearray()
+    cell_offsets = [0]
+    row_starts = []
+    for row in [header] + rows:
+        row_starts.append(len(cell_offsets) - 1)
+        for cell in row:
+            blob += cell.encode('utf-8')
+            cell_offsets.append(len(blob))
+    row_starts.append(len(cell_offsets) - 1)
+
+    preamble = PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(rows), len(header), len(numeric), digest)
+    parts = [
+        preamble,
+        np.asarray(numeric, dtype='<u2').tobytes(),
+    ]
+    offset = sum(len(part) for part in parts)
+    parts.append(b'\x00' * (_pad(offset) - offset))
+    parts.append(values.tobytes())
+    parts.append(np.asarray(row_starts, dtype='<u4').tobytes())
+    parts.append(np.asarray(cell_offsets, dtype='<u4').tobytes())
+    parts.append(bytes(blob))
+
+    # Write to a temporary file and rename so readers never see a partial file
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, 'wb') as output:
+        for part in parts:
+            output.write(part)
+    os.replace(temp_path, output_path)
+    return len(rows)
+
+
+class MappedRows:
+    """
+    Sequence of CSV rows backed by the string table of a mapped catalog
+
+    Cells are decoded on access; nothing is copied up front.
+    """
+
+    def __init__(self, buffer, row_starts, cell_offsets, blob_offset, first_row=1):
+        self._buffer = buffer
+        self._row_starts = row_starts
+        self._cell_offsets = cell_offsets
+        self._blob_offset = blob_offset
+        self._first_row = first_row
+
+    def __len__(self):
+        return len(self._row_starts) - 1 - self._first_row
+
+    def width(self, position):
+        """Number of cells in the row at position"""
+        r = position + self._first_row
+        return int(self._row_starts[r + 1] - self._row_starts[r])
+
+    def cell(self, position, j):
+        """Cell j of the row at position"""
+        start = int(self._row_starts[position + self._first_row]) + j
+        begin = self._blob_offset + int(self._cell_offsets[start])
+        end = self._blob_offset + int(self._cell_offsets[start + 1])
+        return self._buffer[begin:end].decode('utf-8')
+
+    def column(self, j):
+        """Cell j of every row, None for rows without that many cells"""
+        return [
+            self.cell(position, j) if j < self.width(position) else None
+            for position in range(len(self))
+        ]
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return [self.cell(position, j) for j in range(self.width(position))]
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+
+class CatalogFile:
+    """
+    Read-only, memory-mapped compiled catalog
+
+    Attributes:
+    - header: CSV header row
+    - rows: MappedRows over the data rows
+    - numeric_columns: Positions of the numeric columns in the header
+    - values: float64 array (numeric columns, rows) viewing the mapped file
+    - source_digest: SHA-256 of the CSV the file was compiled from
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as compiled:
+            self._mmap = mmap.mmap(compiled.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._mmap
+
+        if len(buffer) < PREAMBLE.size:
+            raise CatalogFileError(f"{path} is truncated")
+        magic, version, n_rows, n_cols, n_numeric, digest = PREAMBLE.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise CatalogFileError(f"{path} is not a version {FORMAT_VERSION} catalog file")
+        self.source_digest = digest
+
+        try:
+            offset = PREAMBLE.size
+            self.numeric_columns = np.frombuffer(buffer, dtype='<u2', count=n_numeric, offset=offset).tolist()
+            offset = _pad(offset + 2 * n_numeric)
+            self.values = np.frombuffer(
+                buffer, dtype='<f8', count=n_numeric * n_rows, offset=offset
+            ).reshape(n_numeric, n_rows)
+            offset += 8 * n_numeric * n_rows
+
+            row_starts = np.frombuffer(buffer, dtype='<u4', count=n_rows + 2, offset=offset)
+            offset += 4 * (n_rows + 2)
+            n_cells = int(row_starts[-1])
+            cell_offsets = np.frombuffer(buffer, dtype='<u4', count=n_cells + 1, offset=offset)
+            offset += 4 * (n_cells + 1)
+            if offset + int(cell_offsets[-1]) > len(buffer):
+                raise CatalogFileError(f"{path} is truncated")
+        except ValueError as e:
+            # np.frombuffer raises ValueError when the file is too short
+            raise CatalogFileError(f"{path} is malformed: {e}")
+
+        table = MappedRows(buffer, row_starts, cell_offsets, offset, first_row=0)
+        self.header = table[0]
+        self.rows = MappedRows(buffer, row_starts, cell_offsets, offset)
+
+    @classmethod
+    def open_if_fresh(cls, path, source_digest):
+        """
+        Open the compiled catalog at path if it exists and was compiled from
+        a CSV with the given SHA-256 digest, otherwise return None
+        """
+        if not os.path.exists(path):
+            return None
+        compiled = cls(path)
+        if compiled.source_digest != source_digest:
+            return None
+        return compiled
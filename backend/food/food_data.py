@@ -1,89 +1,370 @@
 """
 Functions to handle food data from the CSV file
+
+The catalog is loaded once per process into a FoodCatalog, which keeps the
+raw rows for building responses, O(1) lookups by food_code and row index,
+and the numeric columns as float arrays. When a compiled catalog (see the
+compile_catalog management command) matches the CSV it is memory-mapped
+instead of parsing the CSV. Changes to the CSV are picked up by
+building a new catalog and swapping it in (see get_catalog).
 """
-import csv
+import hashlib
 import os
+import threading
+import time
 from pathlib import Path
 
+import numpy as np
+
+from .catalog_file import CatalogFile, column_cells, parse_csv, parse_float, read_csv, row_cell
+from .food_index import FoodNameIndex
+
 # Get the absolute path to the food_details.csv file
 BASE_DIR = Path(__file__).resolve().parent.parent
 FOOD_CSV_PATH = os.path.join(BASE_DIR, 'food', 'food_details.csv')
+FOOD_CATALOG_PATH = os.path.join(BASE_DIR, 'food', 'food_details.bin')
+
+# Columns that hold text; every other column is parsed as a number
+TEXT_COLUMNS = ('food_code', 'food_name', 'primarysource', 'servings_unit')
+
+# Nutrient columns are per 100 g; the same nutrient per serving is in the
+# column with this prefix
+SERVING_PREFIX = 'unit_serving_'
+NUTRIENT_BASES = ('100g', 'serving')
+
+# Comparison operators accepted by query_foods; NaN never matches
+QUERY_OPERATORS = {
+    'gt': np.greater,
+    'gte': np.greater_equal,
+    'lt': np.less,
+    'lte': np.less_equal,
+    'eq': np.equal,
+}
+DEFAULT_QUERY_FIELDS = ('energy_kcal', 'protein_g', 'carb_g', 'fat_g')
+
+
+class FoodCatalog:
+    """
+    In-memory, indexed copy of the food catalog
+
+    Attributes:
+    - header: Header row exactly as read from the CSV
+    - rows: Data rows as lists of strings (or MappedRows), rows[i - 1] is
+      food index i
+    - columns: Header names normalised (BOM stripped)
+    - values: float64 block of shape (numeric columns, rows), NaN where empty
+    - present: Boolean array, False for blank rows
+    - nutrient_columns: Per-100 g nutrient columns that have a per-serving
+      counterpart
+    - name_index: FoodNameIndex over the lowercased food names
+    - version: Content version, set by load_catalog
+    - source_stat: (mtime_ns, size) of the CSV it was loaded from
+    """
+
+    def __init__(self, header, rows, values=None):
+        self.header = header
+        self.rows = rows
+        self.columns = [name.lstrip('\ufeff') for name in header]
+
+        self.codes = column_cells(rows, 0)
+        self.names = column_cells(rows, 1)
+
+        self.by_code = {}
+        self.by_index = {}
+        for i, code in enumerate(self.codes, 1):  # Start from 1 to match row numbers
+            if code is not None:
+                self.by_index[i] = i - 1
+                self.by_code.setdefault(code, i - 1)
+        self.present = np.array([code is not None for code in self.codes], dtype=bool)
+
+        self.names_lower = [name.lower() if name is not None else None for name in self.names]
+        self.name_index = FoodNameIndex(self.names_lower)
+
+        self.numeric_columns = [
+            name for name in self.columns if name not in TEXT_COLUMNS
+        ]
+        self.column_positions = {name: j for j, name in enumerate(self.columns)}
+        self.numeric_positions = {name: k for k, name in enumerate(self.numeric_columns)}
+        if values is None:
+            values = np.full((len(self.numeric_columns), len(rows)), np.nan)
+            for k, name in enumerate(self.numeric_columns):
+                j = self.column_positions[name]
+                values[k] = [parse_float(row[j]) if j < len(row) else np.nan for row in rows]
+        self.values = values
+
+        self.nutrient_columns = [
+            name for name in self.numeric_columns
+            if not name.startswith(SERVING_PREFIX) and SERVING_PREFIX + name in self.numeric_positions
+        ]
+
+        self.version = None
+        self.source_stat = None
+
+    @classmethod
+    def from_csv(cls, path=FOOD_CSV_PATH):
+        """Parse the catalog CSV at path"""
+        header, rows = read_csv(path)
+        return cls(header, rows)
+
+    @classmethod
+    def from_compiled(cls, compiled):
+        """Build the catalog on top of a memory-mapped CatalogFile"""
+        expected = [
+            j for j, name in enumerate(compiled.header) if name.lstrip('\ufeff') not in TEXT_COLUMNS
+        ]
+        if compiled.numeric_columns != expected:
+            raise ValueError("Compiled catalog was built with different text columns")
+        return cls(compiled.header, compiled.rows, compiled.values)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, name):
+        """Return the float array for a numeric column"""
+        return self.values[self.numeric_positions[name]]
+
+    def cell(self, position, name):
+        """Text of column name for the row at position"""
+        return row_cell(self.rows, position, self.column_positions[name])
+
+    def nutrient_values(self, position, fields, basis='100g', qty=1.0):
+        """
+        Nutrient values of the row at position as floats
+
+        Parameters:
+        - fields: Names of nutrient columns (per 100 g names)
+        - basis: '100g' or 'serving'
+        - qty: Number of basis units (100 g portions or servings)
+
+        Returns:
+        - Dictionary of field to value, None where the catalog has no value
+        """
+        if basis == 'serving':
+            columns = [self.numeric_positions[SERVING_PREFIX + name] for name in fields]
+        else:
+            columns = [self.numeric_positions[name] for name in fields]
+        scaled = np.round(self.values[columns, position] * qty, 3)
+        return {
+            name: None if np.isnan(value) else float(value)
+            for name, value in zip(fields, scaled)
+        }
+
+    def food_details(self, position):
+        """Build the food details dictionary for the row at position"""
+        row = self.rows[position]
+        header = self.header
+
+        # Create a dictionary with header keys and row values
+        food_data = {
+            header[j]: value for j, value in enumerate(row) if j < len(header)
+        }
+
+        # Add nutritional information in a structured format
+        nutrients = {
+            'calories': food_data.get('energy_kcal', '0'),
+            'carbs': food_data.get('carb_g', '0'),
+            'protein': food_data.get('protein_g', '0'),
+            'fat': food_data.get('fat_g', '0'),
+            'fiber': food_data.get('fibre_g', '0'),
+            'sugar': food_data.get('freesugar_g', '0'),
+            'calcium': food_data.get('calcium_mg', '0'),
+            'iron': food_data.get('iron_mg', '0'),
+            'sodium': food_data.get('sodium_mg', '0'),
+            'vitaminC': food_data.get('vitc_mg', '0'),
+            'servingSize': food_data.get('servings_unit', 'serving')
+        }
+
+        food_data['nutrients'] = nutrients
+        return food_data
+
+
+# Seconds between checks of food_details.csv for changes
+CATALOG_CHECK_INTERVAL = 5.0
 
-def search_food(query, limit=10):
+# Seconds the CSV's (mtime, size) must stay unchanged before it is reloaded.
+# A file cut off on a row boundary parses cleanly, so a write still in
+# progress is only recognised by the file still changing. Writers that
+# replace the file in one step (temp file + os.replace, as compile_csv
+# does) never expose a partial file at all.
+CATALOG_QUIET_PERIOD = 10.0
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_last_check = 0.0
+_pending_stat = None
+_pending_since = 0.0
+
+
+def get_catalog():
+    """
+    Return the active food catalog, loading it on first use
+
+    At most every CATALOG_CHECK_INTERVAL seconds the CSV is checked for
+    changes; once a changed file has been left alone for
+    CATALOG_QUIET_PERIOD seconds it is loaded on a background thread and
+    swapped in when complete, while callers keep getting the current version.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    else:
+        _check_for_changes()
+    return _catalog
+
+
+def get_catalog_version():
+    """Version of the active catalog (prefix of the CSV's SHA-256)"""
+    return get_catalog().version
+
+
+def reload_catalog(expected_stat=None):
+    """
+    Load the catalog again and swap it in if its content changed
+
+    A catalog that fails to load or validate is discarded and the current
+    one stays active, as is one read from a file whose (mtime, size) is no
+    longer expected_stat.
+
+    Returns:
+    - The active catalog
+    """
+    global _catalog
+    with _reload_lock:
+        try:
+            catalog = load_catalog()
+        except Exception as e:
+            print(f"Error reloading food catalog: {e}")
+            return _catalog
+        if expected_stat is not None and catalog.source_stat != expected_stat:
+            # Written to again since it went quiet; the next check retries
+            return _catalog
+
+        if _catalog is None or catalog.version != _catalog.version:
+            # Rebinding the module reference is atomic; readers holding the
+            # previous catalog finish their request with it
+            _catalog = catalog
+        else:
+            _catalog.source_stat = catalog.source_stat
+        return _catalog
+
+
+def _check_for_changes():
+    global _last_check, _pending_stat, _pending_since
+    now = time.monotonic()
+    if now - _last_check < CATALOG_CHECK_INTERVAL:
+        return
+    _last_check = now
+
+    try:
+        stat = _source_stat(FOOD_CSV_PATH)
+    except OSError:
+        return
+    if stat == _catalog.source_stat:
+        _pending_stat = None
+        return
+    if stat != _pending_stat:
+        # Changed since the last check, possibly still being written
+        _pending_stat = stat
+        _pending_since = now
+        return
+    if now - _pending_since >= CATALOG_QUIET_PERIOD and not _reload_lock.locked():
+        threading.Thread(
+            target=reload_catalog, args=(stat,), name='food-catalog-reload', daemon=True
+        ).start()
+
+
+def _source_stat(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_catalog():
     """
-    Search for foods containing the query string in their name
-    
+    Load the food catalog from the compiled file when it is present and
+    matches the CSV, otherwise from the CSV itself
+
+    Raises ValueError if the CSV changes while being read or has rows of
+    the wrong width. A file truncated on a row boundary passes both
+    checks, which is why get_catalog waits for CATALOG_QUIET_PERIOD first.
+    """
+    stat = _source_stat(FOOD_CSV_PATH)
+    with open(FOOD_CSV_PATH, 'rb') as csv_file:
+        data = csv_file.read()
+    if _source_stat(FOOD_CSV_PATH) != stat:
+        raise ValueError("food_details.csv changed while it was being read")
+    digest = hashlib.sha256(data).digest()
+
+    catalog = None
+    try:
+        compiled = CatalogFile.open_if_fresh(FOOD_CATALOG_PATH, digest)
+        if compiled is not None:
+            catalog = FoodCatalog.from_compiled(compiled)
+    except Exception as e:
+        print(f"Error loading compiled food catalog, using CSV: {e}")
+
+    if catalog is None:
+        header, rows = parse_csv(data.decode('utf-8'))
+        for i, row in enumerate(rows, 1):
+            if len(row) > 0 and len(row) != len(header):
+                raise ValueError(f"food_details.csv row {i} has {len(row)} columns, expected {len(header)}")
+        catalog = FoodCatalog(header, rows)
+
+    catalog.version = digest.hex()[:16]
+    catalog.source_stat = stat
+    return catalog
+
+
+def search_food(query, limit=10, fuzzy=False):
+    """
+    Search for foods by name, best matches first
+
+    Exact word matches rank above word-prefix matches, which rank above
+    plain substring matches; within each group shorter names come first.
+
     Parameters:
     - query: The search string
     - limit: Maximum number of results to return
-    
+    - fuzzy: Also return close spellings (trigram similarity) after the
+      exact matches
+
     Returns:
     - List of food items with their indices
     """
     results = []
-    
+
     try:
-        with open(FOOD_CSV_PATH, 'r', encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            # Skip header row
-            next(reader)
-            
-            for i, row in enumerate(reader, 1):  # Start from 1 to match row numbers
-                if len(row) > 1 and query.lower() in row[1].lower():  # food_name is in index 1
-                    results.append({
-                        'id': row[0],  # food_code
-                        'name': row[1],  # food_name
-                        'index': i
-                    })
-                    
-                    if len(results) >= limit:
-                        break
+        catalog = get_catalog()
+
+        for position, _ in catalog.name_index.search(query, limit, fuzzy):
+            results.append({
+                'id': catalog.codes[position],  # food_code
+                'name': catalog.names[position],  # food_name
+                'index': position + 1
+            })
     except Exception as e:
         print(f"Error searching food data: {e}")
-        
+
     return results
 
 def get_food_by_index(index):
     """
     Get food details by its index in the CSV file
-    
+
     Parameters:
     - index: Index of the food in the CSV (1-based, accounting for header)
-    
+
     Returns:
     - Dictionary of food details or None if not found
     """
     try:
-        with open(FOOD_CSV_PATH, 'r', encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            header = next(reader)
-            
-            for i, row in enumerate(reader, 1):  # Start from 1 to match row numbers
-                if i == index and len(row) > 0:
-                    # Create a dictionary with header keys and row values
-                    food_data = {
-                        header[j]: value for j, value in enumerate(row) if j < len(header)
-                    }
-                    
-                    # Add nutritional information in a structured format
-                    nutrients = {
-                        'calories': food_data.get('energy_kcal', '0'),
-                        'carbs': food_data.get('carb_g', '0'),
-                        'protein': food_data.get('protein_g', '0'),
-                        'fat': food_data.get('fat_g', '0'),
-                        'fiber': food_data.get('fibre_g', '0'),
-                        'sugar': food_data.get('freesugar_g', '0'),
-                        'calcium': food_data.get('calcium_mg', '0'),
-                        'iron': food_data.get('iron_mg', '0'),
-                        'sodium': food_data.get('sodium_mg', '0'),
-                        'vitaminC': food_data.get('vitc_mg', '0'),
-                        'servingSize': food_data.get('servings_unit', 'serving')
-                    }
-                    
-                    food_data['nutrients'] = nutrients
-                    return food_data
-                    
-        return None
+        catalog = get_catalog()
+        position = catalog.by_index.get(index)
+        if position is None:
+            return None
+        return catalog.food_details(position)
     except Exception as e:
         print(f"Error getting food by index: {e}")
         return None
@@ -91,44 +372,196 @@ def get_food_by_index(index):
 def get_food_by_id(food_id):
     """
     Get food details by its food_code
-    
+
     Parameters:
     - food_id: The food_code to search for
-    
+
     Returns:
     - Dictionary of food details or None if not found
     """
     try:
-        with open(FOOD_CSV_PATH, 'r', encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            header = next(reader)
-            
-            for row in reader:
-                if len(row) > 0 and row[0] == food_id:
-                    # Create a dictionary with header keys and row values
-                    food_data = {
-                        header[j]: value for j, value in enumerate(row) if j < len(header)
-                    }
-                    
-                    # Add nutritional information in a structured format
-                    nutrients = {
-                        'calories': food_data.get('energy_kcal', '0'),
-                        'carbs': food_data.get('carb_g', '0'),
-                        'protein': food_data.get('protein_g', '0'),
-                        'fat': food_data.get('fat_g', '0'),
-                        'fiber': food_data.get('fibre_g', '0'),
-                        'sugar': food_data.get('freesugar_g', '0'),
-                        'calcium': food_data.get('calcium_mg', '0'),
-                        'iron': food_data.get('iron_mg', '0'),
-                        'sodium': food_data.get('sodium_mg', '0'),
-                        'vitaminC': food_data.get('vitc_mg', '0'),
-                        'servingSize': food_data.get('servings_unit', 'serving')
-                    }
-                    
-                    food_data['nutrients'] = nutrients
-                    return food_data
-                    
-        return None
+        catalog = get_catalog()
+        position = catalog.by_code.get(food_id)
+        if position is None:
+            return None
+        return catalog.food_details(position)
     except Exception as e:
         print(f"Error getting food by ID: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+def get_foods(food_ids=(), indices=()):
+    """
+    Get food details for many food_codes and indices at once
+
+    All lookups are served from the same catalog version.
+
+    Parameters:
+    - food_ids: food_codes to look up
+    - indices: Indices to look up (1-based, accounting for header)
+
+    Returns:
+    - (by_id, by_index): dictionaries mapping each requested id or index to
+      its food details, or to None if not found
+    """
+    by_id = {}
+    by_index = {}
+    try:
+        catalog = get_catalog()
+        for food_id in food_ids:
+            position = catalog.by_code.get(food_id)
+            by_id[food_id] = catalog.food_details(position) if position is not None else None
+        for index in indices:
+            position = catalog.by_index.get(index)
+            by_index[index] = catalog.food_details(position) if position is not None else None
+    except Exception as e:
+        print(f"Error getting foods: {e}")
+    return by_id, by_index
+
+def get_food_nutrients(food_id=None, index=None, fields=None, basis='100g', qty=1.0):
+    """
+    Get scaled nutrient values of a food by its food_code or index
+
+    Parameters:
+    - food_id: The food_code to look up (used when given)
+    - index: Index of the food in the CSV (1-based, accounting for header)
+    - fields: Nutrient columns to return, all nutrient columns when empty
+    - basis: '100g' or 'serving'
+    - qty: Number of basis units to scale the values to
+
+    Returns:
+    - Dictionary with the food's identity and its values, or None if not
+      found
+
+    Raises:
+    - ValueError: for an unknown basis or field
+    """
+    if basis not in NUTRIENT_BASES:
+        raise ValueError(f"basis must be one of: {', '.join(NUTRIENT_BASES)}")
+
+    catalog = get_catalog()
+    fields = list(fields) if fields else catalog.nutrient_columns
+    unknown = [name for name in fields if name not in catalog.nutrient_columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    if food_id:
+        position = catalog.by_code.get(food_id)
+    else:
+        position = catalog.by_index.get(index)
+    if position is None:
+        return None
+
+    return {
+        'food_id': catalog.codes[position],
+        'food_index': position + 1,
+        'food_name': catalog.names[position],
+        'basis': basis,
+        'qty': qty,
+        'servings_unit': catalog.cell(position, 'servings_unit'),
+        'values': catalog.nutrient_values(position, fields, basis, qty)
+    }
+
+def query_foods(predicates, sort=None, descending=False, limit=20, offset=0, fields=None):
+    """
+    Find foods whose numeric columns satisfy all of the given predicates
+
+    Parameters:
+    - predicates: List of (column, operator, value); operator is one of
+      QUERY_OPERATORS. Foods with no value for a column never match.
+    - sort: Numeric column to order by (catalog order when None)
+    - descending: Sort from high to low; foods without a value come last
+    - limit: Maximum number of results to return
+    - offset: Number of matching results to skip
+    - fields: Numeric columns to return for each food; defaults to the
+      main macros plus the filtered and sorted columns
+
+    Returns:
+    - (count, results): total number of matches and the requested page
+
+    Raises:
+    - ValueError: for an unknown column or operator
+    """
+    catalog = get_catalog()
+    if fields is None:
+        fields = list(DEFAULT_QUERY_FIELDS)
+        for column in [column for column, _, _ in predicates] + ([sort] if sort else []):
+            if column not in fields:
+                fields.append(column)
+
+    unknown = [
+        column for column in [column for column, _, _ in predicates] + list(fields) + ([sort] if sort else [])
+        if column not in catalog.numeric_positions
+    ]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(dict.fromkeys(unknown))}")
+
+    mask = catalog.present.copy()
+    for column, operator, value in predicates:
+        if operator not in QUERY_OPERATORS:
+            raise ValueError(f"Unknown operator: {operator}")
+        mask &= QUERY_OPERATORS[operator](catalog.column(column), value)
+    positions = np.flatnonzero(mask)
+
+    if sort:
+        keys = catalog.column(sort)[positions]
+        # lexsort puts NaN last in both directions; ties keep catalog order
+        positions = positions[np.lexsort((positions, -keys if descending else keys))]
+
+    page = positions[offset:offset + limit]
+    columns = [catalog.numeric_positions[column] for column in fields]
+    block = catalog.values[np.ix_(columns, page)]
+
+    results = []
+    for i, position in enumerate(page.tolist()):
+        results.append({
+            'id': catalog.codes[position],
+            'name': catalog.names[position],
+            'index': position + 1,
+            'values': {
+                column: None if np.isnan(value) else float(value)
+                for column, value in zip(fields, block[:, i])
+            }
+        })
+    return len(positions), results
+
+def get_food_macros(food_ids=(), indices=()):
+    """
+    Get identity and per-100 g macros of many foods at once, as numbers
+
+    All lookups are served from the same catalog version.
+
+    Parameters:
+    - food_ids: food_codes to look up
+    - indices: Indices to look up (1-based, accounting for header)
+
+    Returns:
+    - (by_id, by_index): dictionaries mapping each requested id or index to
+      {'food_id', 'food_index', 'food_name', 'calories', 'protein',
+      'carbohydrates', 'fat'}, or to None if not found. Missing values are 0.
+    """
+    food_ids = list(food_ids)
+    catalog = get_catalog()
+    lookups = [(food_id, catalog.by_code.get(food_id)) for food_id in food_ids]
+    lookups += [(index, catalog.by_index.get(index)) for index in indices]
+    found = [position for _, position in lookups if position is not None]
+
+    columns = [catalog.numeric_positions[name] for name in ('energy_kcal', 'protein_g', 'carb_g', 'fat_g')]
+    block = np.nan_to_num(catalog.values[np.ix_(columns, found)]).T.tolist()
+    macros = {}
+    for position, (calories, protein, carbohydrates, fat) in zip(found, block):
+        macros[position] = {
+            'food_id': catalog.codes[position],
+            'food_index': position + 1,
+            'food_name': catalog.names[position],
+            'calories': calories,
+            'protein': protein,
+            'carbohydrates': carbohydrates,
+            'fat': fat
+        }
+
+    by_id = {}
+    by_index = {}
+    for i, (key, position) in enumerate(lookups):
+        target = by_id if i < len(food_ids) else by_index
+        target[key] = macros.get(position) if position is not None else None
+    return by_id, by_index
@@ -0,0 +1,225 @@
+"""
+Inverted index over food names for ranked autocomplete
+"""
+import heapq
+import re
+from bisect import bisect_left
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Match tiers, best first
+EXACT_TOKEN = 0
+WORD_PREFIX = 1
+SUBSTRING = 2
+FUZZY = 3
+
+# Fuzzy search: minimum share of the query's trigrams a name must contain,
+# the most postings read per query and the most names rescored per query
+FUZZY_THRESHOLD = 0.5
+FUZZY_POSTINGS_BUDGET = 5000
+FUZZY_CANDIDATE_BUDGET = 200
+
+
+def tokenize(text):
+    """Split lowercased text into alphanumeric tokens"""
+    return TOKEN_RE.findall(text)
+
+
+def trigrams(text):
+    """Set of character trigrams of each token, padded like pg_trgm"""
+    grams = set()
+    for token in tokenize(text):
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FoodNameIndex:
+    """
+    Token and prefix index over lowercased food names
+
+    Every posting list is kept in rank order (shorter names first, then
+    catalog order), so the best matches of each tier come out first and a
+    search can stop as soon as it has `limit` results.
+    """
+
+    def __init__(self, names_lower):
+        self.names = names_lower
+        self.rank = [0] * len(names_lower)
+        order = sorted(
+            (position for position, name in enumerate(names_lower) if name is not None),
+            key=lambda position: (len(names_lower[position]), position)
+        )
+        for r, position in enumerate(order):
+            self.rank[position] = r
+        self.order = order
+
+        # token -> positions of names containing that token, in rank order
+        self.postings = {}
+        self.name_tokens = [()] * len(names_lower)
+        for position in order:
+            tokens = tuple(tokenize(names_lower[position]))
+            self.name_tokens[position] = tokens
+            for token in dict.fromkeys(tokens):
+                self.postings.setdefault(token, []).append(position)
+
+        # Sorted vocabulary for prefix ranges, and sorted proper suffixes of
+        # every token for infix (substring) lookups
+        self.vocab = sorted(self.postings)
+        suffixes = sorted(
+            (token[s:], token) for token in self.vocab for s in range(1, len(token))
+        )
+        self.suffixes = [suffix for suffix, _ in suffixes]
+        self.suffix_tokens = [token for _, token in suffixes]
+
+        # trigram -> positions of names containing it, in rank order
+        self.trigram_postings = {}
+        self.name_trigrams = [frozenset()] * len(names_lower)
+        for position in order:
+            grams = frozenset(trigrams(names_lower[position]))
+            self.name_trigrams[position] = grams
+            for gram in grams:
+                self.trigram_postings.setdefault(gram, []).append(position)
+
+    def search(self, query, limit=10, fuzzy=False):
+        """
+        Return up to limit (position, tier) pairs for query, best first
+
+        With fuzzy set, slots left after the exact, prefix and substring
+        tiers are filled with typo-tolerant trigram matches.
+        """
+        query = query.lower()
+        tokens = tokenize(query)
+        results = []
+        seen = set()
+
+        tiers = []
+        if tokens:
+            tiers.append((EXACT_TOKEN, self._token_matches(tokens, exact=True)))
+            tiers.append((WORD_PREFIX, self._token_matches(tokens, exact=False)))
+        tiers.append((SUBSTRING, self._substring_matches(query, tokens)))
+        if fuzzy:
+            tiers.append((FUZZY, self._fuzzy_matches(query)))
+
+        for tier, matches in tiers:
+            for position in matches:
+                if position in seen:
+                    continue
+                seen.add(position)
+                results.append((position, tier))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _prefix_range(self, prefix):
+        """Vocabulary tokens starting with prefix"""
+        start = bisect_left(self.vocab, prefix)
+        end = start
+        while end < len(self.vocab) and self.vocab[end].startswith(prefix):
+            end += 1
+        return self.vocab[start:end]
+
+    def _infix_tokens(self, fragment):
+        """Vocabulary tokens containing fragment anywhere"""
+        tokens = set(self._prefix_range(fragment))
+        start = bisect_left(self.suffixes, fragment)
+        for i in range(start, len(self.suffixes)):
+            if not self.suffixes[i].startswith(fragment):
+                break
+            tokens.add(self.suffix_tokens[i])
+        return tokens
+
+    def _merge(self, tokens):
+        """Lazily merge the posting lists of tokens, in rank order, deduplicated"""
+        lists = [self.postings[token] for token in tokens]
+        if len(lists) == 1:
+            return iter(lists[0])
+        merged = heapq.merge(*lists, key=self.rank.__getitem__)
+        return _unique(merged)
+
+    def _token_matches(self, tokens, exact):
+        if exact:
+            candidates = [(len(self.postings.get(t, ())), [t]) for t in tokens]
+        else:
+            candidates = []
+            for t in tokens:
+                matched = self._prefix_range(t)
+                candidates.append((sum(len(self.postings[m]) for m in matched), matched))
+
+        # Drive the scan from the most selective query token
+        size, driver = min(candidates, key=lambda candidate: candidate[0])
+        if size == 0:
+            return
+        for position in self._merge(driver):
+            name_tokens = self.name_tokens[position]
+            if exact:
+                if all(t in name_tokens for t in tokens):
+                    yield position
+            elif all(any(n.startswith(t) for n in name_tokens) for t in tokens):
+                yield position
+
+    def _substring_matches(self, query, tokens):
+        if not tokens:
+            # Only punctuation or whitespace; nothing to index on
+            for position in self.order:
+                if query in self.names[position]:
+                    yield position
+            return
+
+        # Every query token lies inside some token of a matching name, so the
+        # longest one narrows the candidates; the raw substring test decides
+        fragment = max(tokens, key=len)
+        infix = self._infix_tokens(fragment)
+        if not infix:
+            return
+        for position in self._merge(infix):
+            if query in self.names[position]:
+                yield position
+
+    def _fuzzy_matches(self, query, threshold=FUZZY_THRESHOLD,
+                       postings_budget=FUZZY_POSTINGS_BUDGET,
+                       candidate_budget=FUZZY_CANDIDATE_BUDGET):
+        """
+        Yield positions of names sharing at least threshold of the query's
+        trigrams, best score first
+
+        Posting lists are read rarest trigram first and reading stops after
+        postings_budget entries; only the candidate_budget names with the
+        most shared trigrams so far are rescored exactly.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return
+
+        lists = sorted(
+            (self.trigram_postings[gram] for gram in query_grams if gram in self.trigram_postings),
+            key=len
+        )
+        counts = {}
+        read = 0
+        for positions in lists:
+            for position in positions[:postings_budget - read]:
+                counts[position] = counts.get(position, 0) + 1
+            read += len(positions)
+            if read >= postings_budget:
+                break
+
+        candidates = heapq.nlargest(
+            candidate_budget, counts, key=lambda position: (counts[position], -self.rank[position])
+        )
+        scored = []
+        for position in candidates:
+            score = len(query_grams & self.name_trigrams[position]) / len(query_grams)
+            if score >= threshold:
+                scored.append((-score, self.rank[position], position))
+        scored.sort()
+        for _, _, position in scored:
+            yield position
+
+
+def _unique(positions):
+    last = None
+    for position in positions:
+        if position != last:
+            yield position
+            last = position
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from food.catalog_file import compile_csv
+from food.food_data import FOOD_CSV_PATH, FOOD_CATALOG_PATH, TEXT_COLUMNS
+from image_api.searchNutrients import NUTRIENT_CSV_PATH, NUTRIENT_CATALOG_PATH, NUTRIENT_TEXT_COLUMNS
+
+
+class Command(BaseCommand):
+    help = "Compile food_details.csv and nutrient_values.csv into memory-mappable binary catalogs"
+
+    def handle(self, *args, **options):
+        catalogs = [
+            (FOOD_CSV_PATH, FOOD_CATALOG_PATH, TEXT_COLUMNS),
+            (NUTRIENT_CSV_PATH, NUTRIENT_CATALOG_PATH, NUTRIENT_TEXT_COLUMNS),
+        ]
+        for csv_path, output_path, text_columns in catalogs:
+            count = compile_csv(csv_path, output_path, text_columns)
+            self.stdout.write(self.style.SUCCESS(f"Compiled {count} rows from {csv_path} into {output_path}"))
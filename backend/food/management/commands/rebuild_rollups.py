@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from food.rollups import rebuild_rollups, verify_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild DailyNutritionRollup from raw food and water entries, or verify it against them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Only report rollups that differ from the raw entries")
+        parser.add_argument('--user', help="Limit to the user with this username")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        if options['verify']:
+            mismatches = verify_rollups(user)
+            for user_id, day, field, stored, expected in mismatches:
+                self.stdout.write(f"user {user_id} {day} {field}: stored {stored}, expected {expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} rollup values differ from the raw entries")
+            self.stdout.write(self.style.SUCCESS("Rollups match the raw entries"))
+            return
+
+        count = rebuild_rollups(user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily rollups"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from food.streaks import rebuild_streaks
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's UserStreak from their food and water history"
+
+    def handle(self, *args, **options):
+        count = rebuild_streaks()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} streaks"))
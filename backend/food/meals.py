@@ -0,0 +1,77 @@
+"""
+Turning client-described food items into FoodConsumption rows
+
+Shared by the addMeal endpoint and offline sync, which both resolve many
+items against the catalog in a single pass.
+"""
+import math
+
+from .food_data import get_food_macros
+from .models import FoodConsumption
+
+# Nutrient fields of FoodConsumption that a request may override
+NUTRIENT_FIELDS = ('calories', 'protein', 'carbohydrates', 'fat')
+
+
+def parse_meal_item(item):
+    """Return (food_id, food_index, quantity, overrides) of an addMeal item"""
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+    try:
+        food_index = int(item.get('food_index') or 0)
+        quantity = float(item.get('quantity', 1))
+        overrides = {
+            field: float(item[field]) for field in NUTRIENT_FIELDS if field in item
+        }
+    except (TypeError, ValueError):
+        raise ValueError("Invalid data format")
+
+    food_id = item.get('food_id') or None
+    if not food_id and food_index <= 0:
+        raise ValueError("Either food_id or food_index must be provided")
+    if not math.isfinite(quantity) or quantity <= 0:
+        raise ValueError("quantity must be a positive number")
+    for field, value in overrides.items():
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"{field} must be a non-negative number")
+    return (str(food_id) if food_id else None, food_index, quantity, overrides)
+
+
+def build_consumptions(user, parsed, **extra):
+    """
+    Resolve parsed items against the catalog in one pass
+
+    Parameters:
+    - user: Owner of the entries
+    - parsed: Dictionary of key to a parse_meal_item result
+    - extra: Optional dictionaries of key to further FoodConsumption field
+      values, e.g. timestamp={key: datetime}
+
+    Returns:
+    - (entries, errors): dictionaries of key to an unsaved FoodConsumption
+      and of key to an error message for items whose food does not exist
+    """
+    by_id, by_index = get_food_macros(
+        [food_id for food_id, _, _, _ in parsed.values() if food_id],
+        [food_index for food_id, food_index, _, _ in parsed.values() if not food_id]
+    )
+
+    entries = {}
+    errors = {}
+    for key, (food_id, food_index, quantity, overrides) in parsed.items():
+        food = by_id.get(food_id) if food_id else by_index.get(food_index)
+        if not food:
+            errors[key] = "Food not found"
+            continue
+        consumption = {
+            'food_index': food['food_index'],
+            'food_id': food['food_id'],
+            'food_name': food['food_name'],
+        }
+        for field in NUTRIENT_FIELDS:
+            consumption[field] = overrides.get(field, food[field] * quantity)
+        for field, values in extra.items():
+            if key in values:
+                consumption[field] = values[key]
+        entries[key] = FoodConsumption(user=user, **consumption)
+    return entries, errors
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    FoodConsumption = apps.get_model('food', 'FoodConsumption')
+    WaterIntake = apps.get_model('food', 'WaterIntake')
+    DailyNutritionRollup = apps.get_model('food', 'DailyNutritionRollup')
+
+    totals = {}
+    food_rows = FoodConsumption.objects.annotate(day=TruncDate('timestamp')).values('user_id', 'day').annotate(
+        calories=Sum('calories'),
+        protein=Sum('protein'),
+        carbohydrates=Sum('carbohydrates'),
+        fat=Sum('fat'),
+        items=Count('id')
+    ).order_by()
+    for row in food_rows:
+        totals[(row.pop('user_id'), row.pop('day'))] = row
+
+    water_rows = WaterIntake.objects.annotate(day=TruncDate('timestamp')).values('user_id', 'day').annotate(
+        water=Sum('amount')
+    ).order_by()
+    for row in water_rows:
+        totals.setdefault((row['user_id'], row['day']), {})['water'] = row['water']
+
+    DailyNutritionRollup.objects.bulk_create(
+        [
+            DailyNutritionRollup(user_id=user_id, date=day, **values)
+            for (user_id, day), values in totals.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('food', '0002_foodconsumption_food_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutritionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories', models.FloatField(default=0)),
+                ('protein', models.FloatField(default=0)),
+                ('carbohydrates', models.FloatField(default=0)),
+                ('fat', models.FloatField(default=0)),
+                ('water', models.FloatField(default=0, help_text='Water amount in ml')),
+                ('items', models.IntegerField(default=0, help_text='Number of food entries')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailynutritionrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_daily_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0003_dailynutritionrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodconsumption',
+            index=models.Index(fields=['user', 'timestamp'], name='food_user_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterintake',
+            index=models.Index(fields=['user', 'timestamp'], name='water_user_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0004_foodconsumption_food_user_timestamp_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodconsumption',
+            name='client_id',
+            field=models.UUIDField(blank=True, editable=False, help_text='Client-generated id of a synced event', null=True),
+        ),
+        migrations.AddField(
+            model_name='waterintake',
+            name='client_id',
+            field=models.UUIDField(blank=True, editable=False, help_text='Client-generated id of a synced event', null=True),
+        ),
+        migrations.AlterField(
+            model_name='foodconsumption',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='waterintake',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='foodconsumption',
+            constraint=models.UniqueConstraint(fields=('user', 'client_id'), name='unique_food_client_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='waterintake',
+            constraint=models.UniqueConstraint(fields=('user', 'client_id'), name='unique_water_client_id'),
+        ),
+    ]
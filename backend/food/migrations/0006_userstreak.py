@@ -0,0 +1,60 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:56
+
+from django.conf import settings
+from datetime import date, datetime, timezone
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_streaks(apps, schema_editor):
+    UserStreak = apps.get_model('food', 'UserStreak')
+    days = set()
+    for model_name in ('FoodConsumption', 'WaterIntake'):
+        model = apps.get_model('food', model_name)
+        days.update(model.objects.annotate(
+            day=TruncDate('timestamp', tzinfo=timezone.utc)
+        ).values_list('user_id', 'day').distinct().order_by())
+
+    # Replay each user's action days with the StreakTracker.sol rules
+    streaks = {}
+    today = (datetime.now(timezone.utc).date() - date(1970, 1, 1)).days
+    for user_id, day in sorted(days):
+        day = (day - date(1970, 1, 1)).days
+        if day > today:
+            continue
+        if user_id not in streaks:
+            streaks[user_id] = (1, day)
+        else:
+            streak, last_day = streaks[user_id]
+            streaks[user_id] = (streak + 1 if day == last_day + 1 else 1, day)
+
+    UserStreak.objects.bulk_create(
+        [
+            UserStreak(user_id=user_id, streak=streak, last_action_day=last_day)
+            for user_id, (streak, last_day) in streaks.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('food', '0005_foodconsumption_client_id_waterintake_client_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_action_day', models.IntegerField(help_text='Days since the Unix epoch (UTC) of the latest action')),
+                ('streak', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='streak', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_streaks, migrations.RunPython.noop),
+    ]
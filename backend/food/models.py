@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class DailyGoal(models.Model):
     """Daily nutritional goals for a user"""
@@ -16,7 +17,16 @@ class WaterIntake(models.Model):
     """Track water intake with timestamp"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='water_intake')
     amount = models.FloatField(help_text="Water amount in ml")
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+    client_id = models.UUIDField(null=True, blank=True, editable=False, help_text="Client-generated id of a synced event")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='water_user_timestamp_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_id'], name='unique_water_client_id'),
+        ]
     
     def __str__(self):
         return f"{self.user.username}'s Water Intake on {self.timestamp}"
@@ -31,7 +41,49 @@ class FoodConsumption(models.Model):
     protein = models.FloatField()
     carbohydrates = models.FloatField()
     fat = models.FloatField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+    client_id = models.UUIDField(null=True, blank=True, editable=False, help_text="Client-generated id of a synced event")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='food_user_timestamp_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_id'], name='unique_food_client_id'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} consumed {self.food_name} on {self.timestamp}"
+
+class DailyNutritionRollup(models.Model):
+    """Per-user totals of one local day, kept up to date as entries are written"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    calories = models.FloatField(default=0)
+    protein = models.FloatField(default=0)
+    carbohydrates = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    water = models.FloatField(default=0, help_text="Water amount in ml")
+    items = models.IntegerField(default=0, help_text="Number of food entries")
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_rollup'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}'s totals on {self.date}"
+
+class UserStreak(models.Model):
+    """
+    Consecutive-day logging streak of a user, kept by the same rules as
+    StreakTracker.sol: days are counted since the Unix epoch in UTC, a second
+    action on the same day changes nothing, an action on the next day extends
+    the streak and any later day restarts it at 1
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='streak')
+    last_action_day = models.IntegerField(help_text="Days since the Unix epoch (UTC) of the latest action")
+    streak = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user.username}'s streak of {self.streak}"
@@ -0,0 +1,137 @@
+"""
+Conditional GET and response caching for the food catalog endpoints
+
+Responses of catalog endpoints depend only on the catalog version and the
+query, so both are hashed into a strong ETag. Matching If-None-Match (or
+If-Modified-Since) requests get a 304, and bodies are kept in a bounded
+LRU cache that is emptied whenever the catalog version changes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .food_data import get_catalog
+
+
+class LRUResponseCache:
+    """
+    Thread-safe LRU mapping of cache keys to response data for a single
+    catalog version
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            if version != self.version:
+                self._reset(version)
+                return None
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, version, key, data):
+        with self._lock:
+            if version != self.version:
+                self._reset(version)
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _reset(self, version):
+        self._entries.clear()
+        self.version = version
+
+
+response_cache = LRUResponseCache(getattr(settings, 'FOOD_RESPONSE_CACHE_SIZE', 2048))
+
+
+def catalog_cached(endpoint, normalize):
+    """
+    Decorate a GET catalog view with ETag/Last-Modified handling, shared
+    cache headers and the in-process response cache
+
+    Parameters:
+    - endpoint: Name that keeps cache keys of different views apart
+    - normalize: Function of the request returning a hashable tuple that
+      identifies the response
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            catalog = get_catalog()
+            version = catalog.version
+            query = normalize(request)
+            key = (endpoint, query)
+            etag = quote_etag(hashlib.sha256(repr((version, key)).encode('utf-8')).hexdigest()[:32])
+            last_modified = catalog.source_stat[0] // 1_000_000_000 if catalog.source_stat else None
+
+            # A client can only hold this ETag from an earlier 200 for the
+            # same query, so a match never hides a validation error
+            if _etag_matches(request, etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                data = response_cache.get(version, key)
+                if data is not None:
+                    response = Response(data)
+                else:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    # Only cache if no reload happened while the view ran
+                    if get_catalog().version == version:
+                        response_cache.put(version, key, response.data)
+                # A date says nothing about the query, so it is only
+                # checked once the request has produced a 200
+                if _unmodified_since(request, last_modified):
+                    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = (
+                f"public, max-age={getattr(settings, 'FOOD_CATALOG_CACHE_MAX_AGE', 300)}"
+            )
+            # The views require authentication, so shared caches must key
+            # responses on the credentials and never serve them to other clients
+            patch_vary_headers(response, ('Authorization',))
+            return response
+        return wrapped
+    return decorator
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def _unmodified_since(request, last_modified):
+    # If-Modified-Since is ignored when If-None-Match is sent
+    if request.META.get('HTTP_IF_NONE_MATCH') or last_modified is None:
+        return False
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    since = parse_http_date_safe(if_modified_since) if if_modified_since else None
+    return since is not None and last_modified <= since
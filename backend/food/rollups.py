@@ -0,0 +1,203 @@
+"""
+Incremental maintenance of DailyNutritionRollup
+
+Every write to FoodConsumption or WaterIntake adds its contribution to the
+(user, local date) rollup row in the same transaction. Single saves and
+deletes (views, admin) are handled by the signal receivers below; bulk
+inserts, which send no signals, call record_food / record_water directly.
+"""
+import math
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import DailyNutritionRollup, FoodConsumption, WaterIntake
+
+ROLLUP_FIELDS = ('calories', 'protein', 'carbohydrates', 'fat', 'water', 'items')
+
+
+def _food_contribution(entry):
+    return {
+        'calories': entry.calories,
+        'protein': entry.protein,
+        'carbohydrates': entry.carbohydrates,
+        'fat': entry.fat,
+        'items': 1
+    }
+
+
+def _water_contribution(entry):
+    return {'water': entry.amount}
+
+
+def _add(deltas, user_id, timestamp, contribution, sign):
+    totals = deltas[(user_id, timezone.localdate(timestamp))]
+    for field, value in contribution.items():
+        totals[field] += sign * value
+
+
+def apply_deltas(deltas):
+    """
+    Add per-day deltas to the rollup table
+
+    Parameters:
+    - deltas: Dictionary of (user_id, date) to {field: amount}
+
+    Rows are created for days that gain entries. A day that only loses
+    entries is never created, so removing entries of a user being deleted
+    cannot resurrect rows the cascade already removed.
+    """
+    for (user_id, day), changes in deltas.items():
+        changes = {field: value for field, value in changes.items() if value}
+        if not changes:
+            continue
+        rollups = DailyNutritionRollup.objects.filter(user_id=user_id, date=day)
+        updates = {field: F(field) + value for field, value in changes.items()}
+        if rollups.update(**updates) or all(value < 0 for value in changes.values()):
+            continue
+        try:
+            with transaction.atomic():
+                DailyNutritionRollup.objects.create(user_id=user_id, date=day, **changes)
+        except IntegrityError:
+            # Another request created the row first
+            rollups.update(**updates)
+
+
+def record_food(entries, sign=1):
+    """Add (or with sign=-1 remove) food entries to their daily rollups"""
+    deltas = defaultdict(lambda: defaultdict(float))
+    for entry in entries:
+        _add(deltas, entry.user_id, entry.timestamp, _food_contribution(entry), sign)
+    apply_deltas(deltas)
+
+
+def record_water(entries, sign=1):
+    """Add (or with sign=-1 remove) water entries to their daily rollups"""
+    deltas = defaultdict(lambda: defaultdict(float))
+    for entry in entries:
+        _add(deltas, entry.user_id, entry.timestamp, _water_contribution(entry), sign)
+    apply_deltas(deltas)
+
+
+CONTRIBUTIONS = {
+    FoodConsumption: _food_contribution,
+    WaterIntake: _water_contribution,
+}
+
+
+@receiver(pre_save, sender=FoodConsumption)
+@receiver(pre_save, sender=WaterIntake)
+def remember_previous_entry(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of an edited entry so its old day can be corrected"""
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=FoodConsumption)
+@receiver(post_save, sender=WaterIntake)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    contribution = CONTRIBUTIONS[sender]
+    deltas = defaultdict(lambda: defaultdict(float))
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None and not created:
+        _add(deltas, previous.user_id, previous.timestamp, contribution(previous), -1)
+    _add(deltas, instance.user_id, instance.timestamp, contribution(instance), 1)
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=FoodConsumption)
+@receiver(post_delete, sender=WaterIntake)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    deltas = defaultdict(lambda: defaultdict(float))
+    _add(deltas, instance.user_id, instance.timestamp, CONTRIBUTIONS[sender](instance), -1)
+    apply_deltas(deltas)
+
+
+def compute_rollups(user=None):
+    """
+    Aggregate raw entries into per-day totals
+
+    Returns:
+    - Dictionary of (user_id, date) to {field: total}
+    """
+    food = FoodConsumption.objects.all()
+    water = WaterIntake.objects.all()
+    if user is not None:
+        food = food.filter(user=user)
+        water = water.filter(user=user)
+
+    totals = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    food_rows = food.annotate(day=TruncDate('timestamp')).values('user_id', 'day').annotate(
+        calories=Sum('calories'),
+        protein=Sum('protein'),
+        carbohydrates=Sum('carbohydrates'),
+        fat=Sum('fat'),
+        items=Count('id')
+    ).order_by()
+    for row in food_rows:
+        totals[(row.pop('user_id'), row.pop('day'))].update(row)
+
+    water_rows = water.annotate(day=TruncDate('timestamp')).values('user_id', 'day').annotate(
+        water=Sum('amount')
+    ).order_by()
+    for row in water_rows:
+        totals[(row['user_id'], row['day'])]['water'] = row['water']
+    return totals
+
+
+def rebuild_rollups(user=None):
+    """
+    Replace stored rollups with totals recomputed from raw entries
+
+    Returns:
+    - Number of rollup rows written
+    """
+    totals = compute_rollups(user)
+    with transaction.atomic():
+        rollups = DailyNutritionRollup.objects.all()
+        if user is not None:
+            rollups = rollups.filter(user=user)
+        rollups.delete()
+        DailyNutritionRollup.objects.bulk_create(
+            [
+                DailyNutritionRollup(user_id=user_id, date=day, **values)
+                for (user_id, day), values in totals.items()
+            ],
+            batch_size=500
+        )
+    return len(totals)
+
+
+def verify_rollups(user=None):
+    """
+    Compare stored rollups with totals recomputed from raw entries
+
+    Returns:
+    - List of (user_id, date, field, stored, expected) for every mismatch
+    """
+    expected = compute_rollups(user)
+    rollups = DailyNutritionRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    stored = {
+        (row.pop('user_id'), row.pop('date')): row
+        for row in rollups.values('user_id', 'date', *ROLLUP_FIELDS)
+    }
+
+    empty = dict.fromkeys(ROLLUP_FIELDS, 0)
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=lambda key: (key[0], key[1])):
+        for field in ROLLUP_FIELDS:
+            have = stored.get(key, empty)[field]
+            want = expected.get(key, empty)[field]
+            if not math.isclose(have, want, rel_tol=1e-9, abs_tol=1e-6):
+                mismatches.append((key[0], key[1], field, have, want))
+    return mismatches
@@ -0,0 +1,121 @@
+"""
+Server-side mirror of the StreakTracker.sol streak rules
+
+Every new FoodConsumption or WaterIntake counts as an action on the UTC day
+of its timestamp. Single saves are handled by the signal receiver below;
+bulk inserts, which send no signals, call record_actions directly.
+
+Like the contract, updates only move forward: an entry dated before the
+latest action day (e.g. logged offline and synced late) or a deleted entry
+does not change the stored streak. rebuild_streaks recomputes streaks from
+the entries that exist.
+"""
+import heapq
+from datetime import date, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import FoodConsumption, UserStreak, WaterIntake
+
+EPOCH = date(1970, 1, 1)
+
+
+def action_day(timestamp):
+    """Days since the Unix epoch of timestamp in UTC, like block.timestamp / 1 days"""
+    return (timestamp.astimezone(dt_timezone.utc).date() - EPOCH).days
+
+
+def next_streak(streak, last_action_day, day):
+    """Streak after an action on day, by the rules of StreakTracker.recordAction"""
+    if day == last_action_day:
+        return streak
+    if day == last_action_day + 1:
+        return streak + 1
+    return 1
+
+
+def record_actions(user_id, timestamps):
+    """Apply actions at timestamps to the user's streak"""
+    # The contract can only record the current day, so future days never count
+    today = action_day(timezone.now())
+    days = sorted({day for day in map(action_day, timestamps) if day <= today})
+    if not days:
+        return
+    with transaction.atomic():
+        streak = UserStreak.objects.select_for_update().filter(user_id=user_id).first()
+        if streak is None:
+            try:
+                with transaction.atomic():
+                    streak = UserStreak.objects.create(user_id=user_id, last_action_day=days[0], streak=1)
+                days = days[1:]
+            except IntegrityError:
+                # Another request created the row first
+                streak = UserStreak.objects.select_for_update().get(user_id=user_id)
+        if not days or days[-1] <= streak.last_action_day:
+            return
+        for day in days:
+            if day > streak.last_action_day:
+                streak.streak = next_streak(streak.streak, streak.last_action_day, day)
+                streak.last_action_day = day
+        streak.save()
+
+
+@receiver(post_save, sender=FoodConsumption)
+@receiver(post_save, sender=WaterIntake)
+def update_streak_on_create(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_actions(instance.user_id, [instance.timestamp])
+
+
+def _action_days(model):
+    """(user_id, day) pairs with at least one entry of model, ordered"""
+    rows = model.objects.annotate(
+        day=TruncDate('timestamp', tzinfo=dt_timezone.utc)
+    ).values_list('user_id', 'day').distinct().order_by('user_id', 'day')
+    for user_id, day in rows.iterator(chunk_size=2000):
+        yield user_id, (day - EPOCH).days
+
+
+def compute_streaks():
+    """
+    Replay every user's action days in order in a single pass
+
+    Returns:
+    - Dictionary of user_id to (streak, last_action_day)
+    """
+    streaks = {}
+    today = action_day(timezone.now())
+    merged = heapq.merge(_action_days(FoodConsumption), _action_days(WaterIntake))
+    for user_id, day in merged:
+        if day > today:
+            continue
+        if user_id in streaks:
+            streak, last_day = streaks[user_id]
+            streaks[user_id] = (next_streak(streak, last_day, day), day)
+        else:
+            streaks[user_id] = (1, day)
+    return streaks
+
+
+def rebuild_streaks():
+    """
+    Replace stored streaks with streaks recomputed from history
+
+    Returns:
+    - Number of streaks written
+    """
+    streaks = compute_streaks()
+    with transaction.atomic():
+        UserStreak.objects.all().delete()
+        UserStreak.objects.bulk_create(
+            [
+                UserStreak(user_id=user_id, streak=streak, last_action_day=last_day)
+                for user_id, (streak, last_day) in streaks.items()
+            ],
+            batch_size=500
+        )
+    return len(streaks)
@@ -1,3 +1,584 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.testing import QueryPlanAssertionsMixin
+from . import food_data
+from .catalog_file import CatalogFile, compile_csv
+from .food_index import EXACT_TOKEN, FUZZY, SUBSTRING, WORD_PREFIX, FoodNameIndex
+from .food_data import FOOD_CSV_PATH, TEXT_COLUMNS, FoodCatalog, get_food_by_id, get_food_by_index
+from .models import DailyNutritionRollup, FoodConsumption, UserStreak, WaterIntake
+from .rollups import verify_rollups
+from .streaks import action_day, rebuild_streaks, record_actions
+from .trends import compute_trends, rolling_stats
+
+
+class HistoryQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """List endpoints must walk the (user, timestamp) indexes, never scan or sort"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        users = [User.objects.create(username=f'user{i}') for i in range(5)]
+        cls.user = users[0]
+        water = []
+        food = []
+        for user in users:
+            for i in range(200):
+                timestamp = now - timedelta(hours=i)
+                water.append(WaterIntake(user=user, amount=250, timestamp=timestamp))
+                food.append(FoodConsumption(
+                    user=user, food_name='Rice', calories=130, protein=2.7, carbohydrates=28, fat=0.3,
+                    timestamp=timestamp
+                ))
+        WaterIntake.objects.bulk_create(water)
+        FoodConsumption.objects.bulk_create(food)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _pages(self, url):
+        """Request the first two pages of url"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        link = response['Link']
+        response = self.client.get(link[1:link.index('>')])
+        self.assertEqual(response.status_code, 200)
+
+    def test_water_intake_list(self):
+        with self.assertIndexedQueries('food_waterintake'):
+            self._pages('/food/waterIntake/?page_size=20')
+
+    def test_food_list(self):
+        with self.assertIndexedQueries('food_foodconsumption'):
+            self._pages('/food/listFood/?start_date=2000-01-01T00:00:00Z&end_date=2100-01-01T00:00:00Z&page_size=20')
+
+    def test_unpaginated_without_parameters(self):
+        # Existing clients read the whole history and sum it by day
+        response = self.client.get('/food/waterIntake/')
+        self.assertEqual(len(response.data), 200)
+        self.assertFalse(response.has_header('Link'))
+        response = self.client.get('/food/listFood/?start_date=2000-01-01T00:00:00Z&end_date=2100-01-01T00:00:00Z')
+        self.assertEqual(len(response.data), 200)
+        self.assertEqual(response.data[0]['timestamp'], min(row['timestamp'] for row in response.data))
+
+
+class StreakTests(TestCase):
+    """Streaks follow the StreakTracker.sol rules, and rebuild_streaks replays full history"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='user')
+        self.now = timezone.now()
+        self.today = action_day(self.now)
+
+    def log(self, days_ago):
+        WaterIntake.objects.create(user=self.user, amount=250, timestamp=self.now - timedelta(days=days_ago))
+
+    def streak(self):
+        streak = UserStreak.objects.get(user=self.user)
+        return streak.streak, streak.last_action_day - self.today
+
+    def test_same_day(self):
+        self.log(0)
+        self.log(0)
+        self.assertEqual(self.streak(), (1, 0))
+
+    def test_next_day(self):
+        self.log(2)
+        self.log(1)
+        self.log(0)
+        self.assertEqual(self.streak(), (3, 0))
+
+    def test_gap_restarts(self):
+        self.log(3)
+        self.log(2)
+        self.log(0)
+        self.assertEqual(self.streak(), (1, 0))
+
+    def test_backdated_entry_is_ignored(self):
+        self.log(0)
+        self.log(1)
+        self.assertEqual(self.streak(), (1, 0))
+
+    def test_future_entry_is_ignored(self):
+        self.log(-1)
+        self.assertFalse(UserStreak.objects.filter(user=self.user).exists())
+        self.log(0)
+        self.log(-1)
+        self.assertEqual(self.streak(), (1, 0))
+
+    def test_concurrent_first_write(self):
+        # Another request creates the row between this one's lookup and insert
+        UserStreak.objects.create(user=self.user, last_action_day=self.today - 1, streak=1)
+        with mock.patch.object(QuerySet, 'first', return_value=None):
+            record_actions(self.user.pk, [self.now])
+        self.assertEqual(self.streak(), (2, 0))
+
+    def test_rebuild_streaks(self):
+        other = User.objects.create(username='other')
+        WaterIntake.objects.bulk_create([
+            WaterIntake(user=self.user, amount=250, timestamp=self.now - timedelta(days=days_ago))
+            for days_ago in (5, 2, 1, 0, -1)
+        ])
+        FoodConsumption.objects.bulk_create([
+            FoodConsumption(
+                user=other, food_name='Rice', calories=130, protein=2.7, carbohydrates=28, fat=0.3,
+                timestamp=self.now - timedelta(days=days_ago)
+            )
+            for days_ago in (4, 3)
+        ])
+        # A backdated entry does not count until the streak is rebuilt
+        self.log(3)
+        self.assertEqual(self.streak(), (1, -3))
+
+        self.assertEqual(rebuild_streaks(), 2)
+        self.assertEqual(self.streak(), (4, 0))
+        other_streak = UserStreak.objects.get(user=other)
+        self.assertEqual((other_streak.streak, other_streak.last_action_day - self.today), (2, -3))
+
+
+class CatalogCacheHeaderTests(TestCase):
+    """Shared caches must not hand authenticated catalog responses to other clients"""
+
+    def test_responses_vary_on_authorization(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='user'))
+        for url in ('/food/foodAutocomplete/?q=rice', '/food/getFood/?index=1'):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('public', response['Cache-Control'])
+            self.assertIn('Authorization', response['Vary'])
+            self.assertEqual(APIClient().get(url).status_code, 401)
+
+    def test_if_modified_since_only_after_validation(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='user'))
+        response = client.get('/food/getFood/?index=1')
+        since = response['Last-Modified']
+        self.assertEqual(client.get('/food/getFood/?index=1', HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+        for url in ('/food/getFood/', '/food/getFood/?index=x', '/food/getFood/?index=999999'):
+            response = client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertIn(response.status_code, (400, 404), url)
+        # A stale ETag overrides a matching date
+        response = client.get('/food/getFood/?index=1', HTTP_IF_NONE_MATCH='"stale"', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+
+
+class RollupMaintenanceTests(TestCase):
+    """Incremental rollup updates must match totals recomputed from the raw entries"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='user')
+        self.other = User.objects.create(username='other')
+        self.now = timezone.now()
+
+    def food(self, user, **fields):
+        return FoodConsumption.objects.create(
+            user=user, food_name='Rice', calories=130, protein=2.7, carbohydrates=28, fat=0.3, **fields
+        )
+
+    def assertRollupsMatch(self):
+        self.assertEqual(verify_rollups(), [])
+
+    def test_create(self):
+        self.food(self.user)
+        WaterIntake.objects.create(user=self.user, amount=250)
+        self.assertRollupsMatch()
+        rollup = DailyNutritionRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.calories, rollup.water, rollup.items), (130, 250, 1))
+
+    def test_edit_moves_entry_to_another_day(self):
+        entry = self.food(self.user)
+        water = WaterIntake.objects.create(user=self.user, amount=250)
+        entry.timestamp = self.now - timedelta(days=2)
+        entry.calories = 200
+        entry.save()
+        water.timestamp = self.now - timedelta(days=2)
+        water.save()
+        self.assertRollupsMatch()
+
+    def test_delete(self):
+        entry = self.food(self.user)
+        self.food(self.user)
+        WaterIntake.objects.create(user=self.user, amount=250).delete()
+        entry.delete()
+        self.assertRollupsMatch()
+
+    def test_bulk_created_meal(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/food/addMeal/', {'items': [
+            {'food_index': 1}, {'food_index': 2, 'quantity': 2}, {'food_index': 1, 'calories': 50},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertRollupsMatch()
+        self.assertEqual(DailyNutritionRollup.objects.get(user=self.user).items, 3)
+
+    def test_user_deletion_cascade(self):
+        for days_ago in range(3):
+            self.food(self.user, timestamp=self.now - timedelta(days=days_ago))
+            WaterIntake.objects.create(user=self.user, amount=250, timestamp=self.now - timedelta(days=days_ago))
+        self.food(self.other)
+        self.user.delete()
+        self.assertRollupsMatch()
+        self.assertFalse(DailyNutritionRollup.objects.filter(user_id=self.user.pk).exists())
+        self.assertEqual(DailyNutritionRollup.objects.get(user=self.other).items, 1)
+
+
+def _baseline_details(header, row):
+    """Food details built the way the original CSV-scanning functions did"""
+    food_data = {header[j]: value for j, value in enumerate(row) if j < len(header)}
+    food_data['nutrients'] = {
+        'calories': food_data.get('energy_kcal', '0'),
+        'carbs': food_data.get('carb_g', '0'),
+        'protein': food_data.get('protein_g', '0'),
+        'fat': food_data.get('fat_g', '0'),
+        'fiber': food_data.get('fibre_g', '0'),
+        'sugar': food_data.get('freesugar_g', '0'),
+        'calcium': food_data.get('calcium_mg', '0'),
+        'iron': food_data.get('iron_mg', '0'),
+        'sodium': food_data.get('sodium_mg', '0'),
+        'vitaminC': food_data.get('vitc_mg', '0'),
+        'servingSize': food_data.get('servings_unit', 'serving')
+    }
+    return food_data
+
+
+class FoodCatalogLookupTests(SimpleTestCase):
+    """get_food_by_index and get_food_by_id return exactly what the CSV scan did, from either catalog source"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(FOOD_CSV_PATH, encoding='utf-8') as csv_file:
+            reader = csv.reader(csv_file)
+            cls.header = next(reader)
+            cls.rows = list(reader)
+
+    def expected_by_index(self, index):
+        if isinstance(index, int) and 1 <= index <= len(self.rows) and self.rows[index - 1]:
+            return _baseline_details(self.header, self.rows[index - 1])
+        return None
+
+    def expected_by_id(self, food_id):
+        for row in self.rows:
+            if row and row[0] == food_id:
+                return _baseline_details(self.header, row)
+        return None
+
+    def check(self, catalog):
+        with mock.patch('food.food_data.get_catalog', return_value=catalog):
+            for index in [-1, 0, '1', *range(1, len(self.rows) + 3)]:
+                self.assertEqual(get_food_by_index(index), self.expected_by_index(index), index)
+            for food_id in ['', 'missing', *(row[0] for row in self.rows if row)]:
+                self.assertEqual(get_food_by_id(food_id), self.expected_by_id(food_id), food_id)
+
+    def test_csv_catalog(self):
+        self.check(FoodCatalog.from_csv(FOOD_CSV_PATH))
+
+    def test_compiled_catalog(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'food_details.bin')
+            compile_csv(FOOD_CSV_PATH, path, TEXT_COLUMNS)
+            self.check(FoodCatalog.from_compiled(CatalogFile(path)))
+
+
+class AddMealValidationTests(TestCase):
+    """Invalid items are reported per item and nothing is logged"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='user'))
+
+    def test_invalid_nutrient_overrides(self):
+        response = self.client.post('/food/addMeal/', {'items': [
+            {'food_index': 1},
+            {'food_index': 1, 'calories': 'nan'},
+            {'food_index': 1, 'protein': 'inf'},
+            {'food_index': 1, 'fat': -1},
+            {'food_index': 1, 'quantity': 'nan'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], {
+            '1': "calories must be a non-negative number",
+            '2': "protein must be a non-negative number",
+            '3': "fat must be a non-negative number",
+            '4': "quantity must be a positive number",
+        })
+        self.assertFalse(FoodConsumption.objects.exists())
+
+
+class CatalogReloadTests(SimpleTestCase):
+    """A changed CSV is swapped in only once it stops changing and loads cleanly"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'food_details.csv')
+        with open(FOOD_CSV_PATH, encoding='utf-8') as csv_file:
+            self.lines = csv_file.read().splitlines(keepends=True)
+        self.write(self.lines)
+        for name, value in [
+            ('FOOD_CSV_PATH', self.path),
+            ('FOOD_CATALOG_PATH', os.path.join(directory.name, 'food_details.bin')),
+            ('_catalog', None),
+            ('_last_check', 0.0),
+            ('_pending_stat', None),
+        ]:
+            patcher = mock.patch.object(food_data, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.clock = 1000.0
+        patcher = mock.patch.object(food_data.time, 'monotonic', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.original = food_data.get_catalog()
+
+    def write(self, lines, mtime_offset=0):
+        with open(self.path, 'w', encoding='utf-8') as csv_file:
+            csv_file.writelines(lines)
+        stat = os.stat(self.path)
+        # Make every write visible in the mtime, however close together
+        mtime = stat.st_mtime_ns + mtime_offset * 1_000_000_000
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def check(self, seconds_later):
+        """Run a change check after seconds_later, reloading on this thread"""
+        self.clock += seconds_later
+        with mock.patch.object(food_data.threading, 'Thread') as thread:
+            thread.side_effect = lambda target, args, **kwargs: mock.Mock(start=lambda: target(*args))
+            return food_data.get_catalog()
+
+    def test_partial_file_is_not_loaded_while_it_grows(self):
+        # Cut off on a row boundary, as a slow writer leaves it mid-write
+        self.write(self.lines[:len(self.lines) // 2], mtime_offset=1)
+        self.assertIs(self.check(food_data.CATALOG_CHECK_INTERVAL), self.original)
+        self.write(self.lines[:-5], mtime_offset=2)
+        self.assertIs(self.check(food_data.CATALOG_QUIET_PERIOD), self.original)
+        self.write(self.lines + ['ZZZ999' + self.lines[-1][self.lines[-1].index(','):]], mtime_offset=3)
+        self.assertIs(self.check(food_data.CATALOG_CHECK_INTERVAL), self.original)
+        self.assertIs(self.check(food_data.CATALOG_QUIET_PERIOD - 1), self.original)
+
+        # Unchanged for the quiet period: the finished file is swapped in
+        catalog = self.check(food_data.CATALOG_CHECK_INTERVAL)
+        self.assertIsNot(catalog, self.original)
+        self.assertNotEqual(catalog.version, self.original.version)
+        self.assertEqual(len(catalog), len(self.original) + 1)
+        self.assertIs(self.check(food_data.CATALOG_QUIET_PERIOD), catalog)
+
+    def test_invalid_file_keeps_current_catalog(self):
+        for lines in (self.lines[:-1] + ['ZZZ999,Extra food\n'], []):
+            self.write(lines, mtime_offset=len(lines) + 1)
+            with mock.patch('builtins.print'):
+                self.assertIs(food_data.reload_catalog(), self.original)
+
+    def test_same_content_keeps_catalog(self):
+        self.write(self.lines, mtime_offset=1)
+        self.assertIs(food_data.reload_catalog(), self.original)
+        self.assertEqual(self.original.source_stat[0], os.stat(self.path).st_mtime_ns)
+
+    def test_file_changed_after_going_quiet_is_not_swapped_in(self):
+        self.write(self.lines[:-1], mtime_offset=1)
+        stat = food_data._source_stat(self.path)
+        self.write(self.lines[:-2], mtime_offset=2)
+        self.assertIs(food_data.reload_catalog(stat), self.original)
+
+
+class GetFoodProjectionTests(TestCase):
+    """getFood projects and scales nutrients with fields, basis and qty"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='user'))
+
+    def get(self, query):
+        return self.client.get(f'/food/getFood/?id=ASC001&{query}')
+
+    def test_fields(self):
+        response = self.get('fields=energy_kcal,protein_g')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['values'], {'energy_kcal': 16.14, 'protein_g': 0.39})
+        self.assertEqual((response.data['basis'], response.data['qty']), ('100g', 1.0))
+        self.assertEqual(self.get('fields=energy_kcal,food_name').status_code, 400)
+
+    def test_basis_and_qty(self):
+        response = self.get('fields=energy_kcal,protein_g&basis=serving&qty=2.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['values'], {'energy_kcal': 84.95, 'protein_g': 2.05})
+        self.assertEqual(response.data['servings_unit'], 'tea cup')
+        response = self.get('qty=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('energy_kcal', response.data['values'])
+        self.assertEqual(self.get('basis=cup').status_code, 400)
+
+    def test_invalid_qty(self):
+        for qty in ('0', '-1', 'nan', 'inf', 'abc', '1e307', '10001'):
+            self.assertEqual(self.get(f'basis=serving&qty={qty}').status_code, 400, qty)
+        self.assertEqual(self.get('qty=10000').status_code, 200)
+
+
+class GetFoodBatchTests(TestCase):
+    """getFoods resolves every id and index on its own, reporting bad ones per item"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='user'))
+
+    def test_get(self):
+        response = self.client.get('/food/getFoods/?ids=ASC001,missing&indices=1,x,1.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ids']['ASC001']['food_name'], 'Hot tea (Garam Chai)')
+        self.assertEqual(response.data['ids']['missing'], {'error': 'Food not found'})
+        self.assertEqual(response.data['indices']['1']['food_name'], 'Hot tea (Garam Chai)')
+        self.assertEqual(response.data['indices']['x'], {'error': 'Invalid index format'})
+        self.assertEqual(response.data['indices']['1.5'], {'error': 'Invalid index format'})
+
+    def test_post_rejects_non_string_ids_and_non_integer_indices(self):
+        response = self.client.post('/food/getFoods/', {
+            'ids': ['ASC001', None, 5], 'indices': [2, '3', 1.5, True, None],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        ids, indices = response.data['ids'], response.data['indices']
+        self.assertEqual(ids['ASC001']['food_name'], 'Hot tea (Garam Chai)')
+        self.assertEqual(ids['None'], {'error': 'Invalid id format'})
+        self.assertEqual(ids['5'], {'error': 'Invalid id format'})
+        self.assertIn('food_name', indices['2'])
+        self.assertIn('food_name', indices['3'])
+        for key in ('1.5', 'True', 'None'):
+            self.assertEqual(indices[key], {'error': 'Invalid index format'}, key)
+
+    def test_limits(self):
+        self.assertEqual(self.client.get('/food/getFoods/').status_code, 400)
+        response = self.client.post('/food/getFoods/', {'ids': 'ASC001'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/food/getFoods/', {'indices': list(range(1, 302))}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TrendStatisticsTests(SimpleTestCase):
+    """Rolling statistics skip days without entries instead of counting them as zero"""
+
+    def test_rolling_stats(self):
+        nan = np.nan
+        mean, std = rolling_stats(np.array([1, nan, 3, 5]), 2)
+        np.testing.assert_allclose(mean, [1, 1, 3, 4])
+        np.testing.assert_allclose(std, [0, 0, 0, 1])
+        mean, std = rolling_stats(np.array([1, nan, 3, 5]), 3)
+        np.testing.assert_allclose(mean, [1, 1, 2, 4])
+        np.testing.assert_allclose(std, [0, 0, 1, 1])
+        mean, std = rolling_stats(np.array([nan, nan, 2]), 2)
+        np.testing.assert_equal(mean, [nan, nan, 2])
+        np.testing.assert_equal(std, [nan, nan, 0])
+
+    def test_compute_trends(self):
+        # Seven history days, then the seven days shown; None is a day without entries
+        calories = [100, None, 200, None, None, None, 300, 1000, 1100, None, 900, 2000, None, 1000]
+        start = date(2025, 1, 1)
+        totals = {}
+        for i, value in enumerate(calories):
+            totals[start + timedelta(days=i)] = {
+                'calories': value or 0, 'protein': 10, 'carbohydrates': 0, 'fat': 0,
+                'water': 0, 'items': 1 if value else 0,
+            }
+        trends = compute_trends(totals, {'calories': 1000, 'protein': 0, 'carbohydrates': 0, 'fat': 0}, 7)
+
+        series = trends['calories']['series']
+        self.assertEqual(series['value'], [1000, 1100, None, 900, 2000, None, 1000])
+        self.assertEqual(series['percent_of_goal'], [100, 110, None, 90, 200, None, 100])
+        # Last day: the 7-day window holds 1000, 1100, 900, 2000, 1000
+        self.assertEqual(series['mean_7'][-1], 1200)
+        self.assertEqual(series['std_7'][-1], 405.0)  # sqrt(820000 / 5)
+        # The 30-day window also holds the history days 100, 200, 300
+        self.assertEqual(series['mean_30'][-1], 825)
+        # First shown day: 200, 300 and 1000 in its 7-day window
+        self.assertEqual(series['mean_7'][0], 500)
+
+        # Within 10% of the goal on 4 of the 5 logged days
+        self.assertEqual(trends['calories']['adherence_percent'], 80)
+        self.assertEqual(trends['calories']['mean_percent_of_goal'], 120)
+        self.assertEqual(trends['calories']['week_over_week'], {
+            'current': 1200, 'previous': 200, 'change': 1000, 'change_percent': 500,
+        })
+
+        # A zero goal has no percentages or adherence
+        protein = trends['protein']
+        self.assertEqual(protein['series']['percent_of_goal'], [None] * 7)
+        self.assertIsNone(protein['adherence_percent'])
+        self.assertEqual(protein['week_over_week']['change'], 0)
+
+
+# Positions 0-8 of a small catalog; position 7 is a blank row
+INDEX_NAMES = [
+    'rice', 'fried rice', 'rice pudding', 'ricecake', 'brown rice', 'licorice', 'lemon rice', None, 'rica',
+]
+
+
+class FoodNameIndexTests(SimpleTestCase):
+    """Matches come tier by tier, shorter names first, each name once"""
+
+    def setUp(self):
+        self.index = FoodNameIndex(INDEX_NAMES)
+
+    def test_tier_order(self):
+        self.assertEqual(self.index.search('Rice'), [
+            (0, EXACT_TOKEN), (1, EXACT_TOKEN), (4, EXACT_TOKEN), (6, EXACT_TOKEN), (2, EXACT_TOKEN),
+            (3, WORD_PREFIX), (5, SUBSTRING),
+        ])
+
+    def test_multiple_tokens(self):
+        self.assertEqual(self.index.search('rice fr'), [(1, WORD_PREFIX)])
+        self.assertEqual(self.index.search('ce pud'), [(2, SUBSTRING)])
+        self.assertEqual(self.index.search('rice lemon'), [(6, EXACT_TOKEN)])
+        self.assertEqual(self.index.search('xyz'), [])
+
+    def test_limit_stops_before_later_tiers(self):
+        def unreachable(*args):
+            raise AssertionError("Later tier read after the limit was reached")
+            yield
+
+        with mock.patch.object(FoodNameIndex, '_substring_matches', unreachable):
+            with mock.patch.object(FoodNameIndex, '_fuzzy_matches', unreachable):
+                self.assertEqual(self.index.search('rice', limit=2, fuzzy=True), [(0, EXACT_TOKEN), (1, EXACT_TOKEN)])
+        self.assertEqual([position for position, _ in self.index.search('rice', limit=6)], [0, 1, 4, 6, 2, 3])
+
+
+class FuzzyFoodSearchTests(SimpleTestCase):
+    """Trigram matches above FUZZY_THRESHOLD fill only the slots the exact tiers leave"""
+
+    def setUp(self):
+        self.index = FoodNameIndex(INDEX_NAMES)
+
+    def test_one_typo(self):
+        self.assertEqual(self.index.search('rice puding'), [])
+        # 'puding' shares 6 of its 7 trigrams with 'pudding'
+        self.assertEqual(self.index.search('puding', fuzzy=True), [(2, FUZZY)])
+
+    def test_below_threshold(self):
+        # Only the leading '  p' trigram is shared
+        self.assertEqual(self.index.search('pxdxnx', fuzzy=True), [])
+        # Names with the token 'rice' share 3 of the 5 trigrams of 'rica', 'licorice' only 'ric'
+        self.assertEqual(list(self.index._fuzzy_matches('rica', threshold=0.6)), [8, 0, 3, 1, 4, 6, 2])
+        self.assertEqual(list(self.index._fuzzy_matches('rica', threshold=0.7)), [8])
+
+    def test_fills_remaining_slots(self):
+        results = self.index.search('rice', fuzzy=True)
+        self.assertEqual([tier for _, tier in results], [EXACT_TOKEN] * 5 + [WORD_PREFIX, SUBSTRING, FUZZY])
+        self.assertEqual(results[-1], (8, FUZZY))
+        self.assertNotIn(FUZZY, [tier for _, tier in self.index.search('rice', limit=7, fuzzy=True)])
+
+    def test_budgets(self):
+        # The rarest trigram 'ica' only occurs in 'rica'
+        self.assertEqual(list(self.index._fuzzy_matches('rica', postings_budget=1)), [8])
+        self.assertEqual(list(self.index._fuzzy_matches('rica', candidate_budget=1)), [8])
+        self.assertEqual(list(self.index._fuzzy_matches('rica', candidate_budget=2)), [8, 0])
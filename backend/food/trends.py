@@ -0,0 +1,128 @@
+"""
+Rolling nutrition statistics over a user's per-day totals
+
+All statistics are computed with NumPy over whole day series. Days without
+any food entry count as missing, not as zero intake, so a forgotten day
+does not drag the averages down.
+"""
+import numpy as np
+
+from .aggregates import NUTRIENT_TOTALS
+
+# Rolling window lengths in days
+TREND_WINDOWS = (7, 30)
+
+# A logged day adheres to a goal when within this fraction of it
+ADHERENCE_TOLERANCE = 0.1
+
+# Decimal places kept in returned series
+TREND_PRECISION = 1
+
+
+def rolling_stats(values, window):
+    """
+    Rolling mean and standard deviation ignoring NaN days
+
+    Parameters:
+    - values: float array of one value per day, NaN where nothing was logged
+    - window: Window length in days, ending at (and including) each day
+
+    Returns:
+    - (mean, std) arrays shaped like values; NaN where the window holds no
+      logged day
+    """
+    logged = ~np.isnan(values)
+    filled = np.where(logged, values, 0.0)
+    # Prefix sums give each window's count, sum and sum of squares in O(n)
+    counts = np.concatenate(([0], np.cumsum(logged)))
+    sums = np.concatenate(([0.0], np.cumsum(filled)))
+    squares = np.concatenate(([0.0], np.cumsum(filled * filled)))
+
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    n = counts[end] - counts[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[end] - sums[start]) / n
+        variance = (squares[end] - squares[start]) / n - mean * mean
+    std = np.sqrt(np.maximum(variance, 0.0))
+    std[n == 0] = np.nan
+    return mean, std
+
+
+def _series(values):
+    """Round a float array to a JSON list, None for NaN"""
+    rounded = np.round(values, TREND_PRECISION)
+    return [None if np.isnan(value) else float(value) for value in rounded]
+
+
+def _value(value):
+    return None if np.isnan(value) else round(float(value), TREND_PRECISION)
+
+
+def compute_trends(totals, goal, history_days):
+    """
+    Trend statistics of per-day totals
+
+    Parameters:
+    - totals: Dictionary of date to daily totals, consecutive days in order,
+      as returned by aggregates.daily_totals
+    - goal: Dictionary of nutrient to daily goal
+    - history_days: Number of leading days in totals that only feed the
+      rolling windows and are left out of the result
+
+    Returns:
+    - Dictionary of nutrient to its series (value, mean_7, std_7, mean_30,
+      std_30, percent of goal) and summary (adherence, week over week change)
+    """
+    items = np.fromiter((day['items'] for day in totals.values()), dtype=np.int64, count=len(totals))
+    logged = items > 0
+    shown = slice(history_days, None)
+    shown_logged = logged[shown]
+
+    trends = {}
+    for field in NUTRIENT_TOTALS:
+        values = np.fromiter((day[field] for day in totals.values()), dtype=np.float64, count=len(totals))
+        values[~logged] = np.nan
+        series = {'value': _series(values[shown])}
+        for window in TREND_WINDOWS:
+            mean, std = rolling_stats(values, window)
+            series[f'mean_{window}'] = _series(mean[shown])
+            series[f'std_{window}'] = _series(std[shown])
+
+        target = float(goal[field])
+        shown_values = values[shown]
+        if target > 0:
+            percent = shown_values / target * 100
+        else:
+            percent = np.full_like(shown_values, np.nan)
+        series['percent_of_goal'] = _series(percent)
+
+        logged_values = shown_values[shown_logged]
+        if len(logged_values) and target > 0:
+            within = np.abs(logged_values - target) <= ADHERENCE_TOLERANCE * target
+            adherence = float(np.mean(within)) * 100
+            mean_percent = float(np.mean(logged_values)) / target * 100
+        else:
+            adherence = mean_percent = np.nan
+
+        # Last 7 days against the 7 before, over logged days only
+        current = values[-7:]
+        previous = values[-14:-7]
+        current_mean = np.nanmean(current) if np.any(~np.isnan(current)) else np.nan
+        previous_mean = np.nanmean(previous) if np.any(~np.isnan(previous)) else np.nan
+        change = current_mean - previous_mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change_percent = change / previous_mean * 100 if previous_mean else np.nan
+
+        trends[field] = {
+            'series': series,
+            'adherence_percent': _value(adherence),
+            'mean_percent_of_goal': _value(mean_percent),
+            'week_over_week': {
+                'current': _value(current_mean),
+                'previous': _value(previous_mean),
+                'change': _value(change),
+                'change_percent': _value(change_percent),
+            },
+        }
+    return trends
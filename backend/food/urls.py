@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     DailyGoalView, WaterIntakeView, food_autocomplete, get_food, AddFoodView,
-    FoodConsumptionListByDateView
+    FoodConsumptionListByDateView, catalog_version, get_food_batch, food_query, AddMealView,
+    DailySummaryView, StreakView, TrendsView
 )
 
 app_name = 'food'
@@ -11,6 +12,13 @@ urlpatterns = [
     path('waterIntake/', WaterIntakeView.as_view(), name='water-intake'),
     path('foodAutocomplete/', food_autocomplete, name='food-autocomplete'),
     path('getFood/', get_food, name='get-food'),
+    path('getFoods/', get_food_batch, name='get-foods'),
+    path('query/', food_query, name='food-query'),
+    path('catalogVersion/', catalog_version, name='catalog-version'),
     path('addFood/', AddFoodView.as_view(), name='add-food'),
+    path('addMeal/', AddMealView.as_view(), name='add-meal'),
     path('listFood/', FoodConsumptionListByDateView.as_view(), name='list-food'),
+    path('summary/', DailySummaryView.as_view(), name='daily-summary'),
+    path('streak/', StreakView.as_view(), name='streak'),
+    path('trends/', TrendsView.as_view(), name='trends'),
 ] 
\ No newline at end of file
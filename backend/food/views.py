@@ -1,18 +1,52 @@
+import math
+from datetime import timedelta
 from django.shortcuts import render
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from django.http import Http404, JsonResponse
-from .models import DailyGoal, WaterIntake, FoodConsumption
+from .models import DailyGoal, WaterIntake, FoodConsumption, UserStreak
 from .serializers import DailyGoalSerializer, WaterIntakeSerializer, FoodConsumptionSerializer
-from .food_data import search_food, get_food_by_index, get_food_by_id
+from .food_data import (
+    search_food, get_food_by_index, get_food_by_id, get_foods, get_food_nutrients, get_catalog,
+    query_foods, QUERY_OPERATORS
+)
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from .aggregates import DEFAULT_DAILY_GOAL, NUTRIENT_TOTALS, daily_totals, day_totals, goal_for
+from .response_cache import catalog_cached
+from .rollups import record_food
+from .streaks import EPOCH, action_day, record_actions
+from .trends import TREND_WINDOWS, compute_trends
+from .meals import build_consumptions, parse_meal_item
+from sync.changes import record_changes
+from backend.pagination import KeysetPagination
 
 # Create your views here.
 
+# Most ids plus indices accepted by a single getFoods request
+MAX_BATCH_FOODS = 300
+
+# Most items accepted by a single addMeal request
+MAX_MEAL_ITEMS = 50
+
+# Largest qty getFood scales nutrients to, far above any real portion
+MAX_FOOD_QTY = 10000
+
+# Longest date range accepted by the summary endpoint, in days
+MAX_SUMMARY_DAYS = 366
+
+# Days covered by the trends endpoint when no start_date is given
+DEFAULT_TREND_DAYS = 90
+
+# Page size limits for the food query endpoint
+DEFAULT_QUERY_LIMIT = 20
+MAX_QUERY_LIMIT = 100
+
 class DailyGoalView(generics.RetrieveUpdateAPIView):
     """API endpoint to get or update user's daily goals"""
     serializer_class = DailyGoalSerializer
@@ -23,13 +57,7 @@ class DailyGoalView(generics.RetrieveUpdateAPIView):
             return DailyGoal.objects.get(user=self.request.user)
         except DailyGoal.DoesNotExist:
             # Create default goals instead of raising 404
-            return DailyGoal.objects.create(
-                user=self.request.user,
-                calories=2000,
-                protein=50,
-                carbohydrates=250,
-                fat=70
-            )
+            return DailyGoal.objects.create(user=self.request.user, **DEFAULT_DAILY_GOAL)
             
     def post(self, request, *args, **kwargs):
         """Create or update daily goals directly from user input"""
@@ -37,12 +65,7 @@ class DailyGoalView(generics.RetrieveUpdateAPIView):
             # Get or create daily goal object for the user
             daily_goal, created = DailyGoal.objects.get_or_create(
                 user=request.user,
-                defaults={
-                    'calories': 2000,
-                    'protein': 50,
-                    'carbohydrates': 250,
-                    'fat': 70
-                }
+                defaults=DEFAULT_DAILY_GOAL
             )
             
             # Update with provided values
@@ -61,33 +84,51 @@ class WaterIntakeView(generics.ListCreateAPIView):
     """API endpoint to list and create water intake records"""
     serializer_class = WaterIntakeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return WaterIntake.objects.filter(user=self.request.user).order_by('-timestamp')
+        return WaterIntake.objects.filter(user=self.request.user).order_by('-timestamp', '-id')
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # The daily rollup is updated by a post_save receiver in this transaction
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+def _autocomplete_query(request):
+    return (
+        request.GET.get('q', '').lower(),
+        request.GET.get('fuzzy', '').lower() in ('1', 'true'),
+    )
+
+def _get_food_query(request):
+    return tuple(
+        request.GET.get(param) for param in ('id', 'index', 'fields', 'basis', 'qty')
+    )
 
 @api_view(['GET'])
+@catalog_cached('food-autocomplete', _autocomplete_query)
 def food_autocomplete(request):
     """
     API endpoint for food autocomplete search
     
     URL Parameters:
     - q: Search query
+    - fuzzy: Set to 1 to also match misspellings
     
     Returns:
     - List of food items matching the query
     """
     query = request.GET.get('q', '')
+    fuzzy = request.GET.get('fuzzy', '').lower() in ('1', 'true')
     
     if not query:
         return Response({'results': []})
     
-    results = search_food(query)
+    results = search_food(query, fuzzy=fuzzy)
     return Response({'results': results})
 
 @api_view(['GET'])
+@catalog_cached('get-food', _get_food_query)
 def get_food(request):
     """
     API endpoint to get food details by ID or index
@@ -95,6 +136,13 @@ def get_food(request):
     URL Parameters:
     - id: Food ID
     - index: Food index (alternative to ID)
+    - fields: Comma separated nutrient columns to return (e.g. energy_kcal,protein_g)
+    - basis: 100g or serving
+    - qty: Number of 100 g portions or servings to scale to (default 1, at
+      most MAX_FOOD_QTY)
+    
+    When fields, basis or qty is given only the requested nutrients are
+    returned, as numbers scaled to basis and qty.
     
     Returns:
     - Food details or error message
@@ -113,12 +161,34 @@ def get_food(request):
     if food_index:
         try:
             food_index = int(food_index)
-            food = get_food_by_index(food_index)
         except ValueError:
             return Response(
                 {'error': 'Invalid index format'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+    
+    if any(param in request.GET for param in ('fields', 'basis', 'qty')):
+        fields = [field for field in request.GET.get('fields', '').split(',') if field]
+        basis = request.GET.get('basis', '100g')
+        try:
+            qty = float(request.GET.get('qty', 1))
+        except ValueError:
+            return Response({'error': 'Invalid qty format'}, status=status.HTTP_400_BAD_REQUEST)
+        if not math.isfinite(qty) or qty <= 0 or qty > MAX_FOOD_QTY:
+            return Response(
+                {'error': f'qty must be a positive number no greater than {MAX_FOOD_QTY}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            if food_index:
+                food = get_food_nutrients(index=food_index, fields=fields, basis=basis, qty=qty)
+            else:
+                food = get_food_nutrients(food_id=food_id, fields=fields, basis=basis, qty=qty)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    elif food_index:
+        food = get_food_by_index(food_index)
     else:
         # Otherwise, use the ID
         food = get_food_by_id(food_id)
@@ -132,6 +202,132 @@ def get_food(request):
     
     return Response(food)
 
+def _batch_index(raw):
+    """Index of a getFoods item, None unless it is an integer or a string of one"""
+    if isinstance(raw, bool) or not isinstance(raw, (int, str)):
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+@api_view(['GET', 'POST'])
+def get_food_batch(request):
+    """
+    API endpoint to get details of many foods in one request
+    
+    Parameters (query string for GET, JSON body for POST):
+    - ids: List of food IDs (comma separated for GET)
+    - indices: List of food indices (comma separated for GET)
+    
+    Returns:
+    - Food details keyed by id and by index; ids or indices that cannot
+      be resolved get an error entry instead of failing the request
+    """
+    if request.method == 'GET':
+        food_ids = [value for value in request.GET.get('ids', '').split(',') if value]
+        raw_indices = [value for value in request.GET.get('indices', '').split(',') if value]
+    else:
+        food_ids = request.data.get('ids', [])
+        raw_indices = request.data.get('indices', [])
+        if not isinstance(food_ids, list) or not isinstance(raw_indices, list):
+            return Response(
+                {'error': 'ids and indices must be lists'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    if not food_ids and not raw_indices:
+        return Response(
+            {'error': 'Missing required parameter: either ids or indices must be provided'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(food_ids) + len(raw_indices) > MAX_BATCH_FOODS:
+        return Response(
+            {'error': f'At most {MAX_BATCH_FOODS} foods can be requested at once'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Anything but a string id or a whole-number index is reported per item
+    ids = {str(food_id): food_id if isinstance(food_id, str) else None for food_id in food_ids}
+    indices = {str(raw): _batch_index(raw) for raw in raw_indices}
+    
+    by_id, by_index = get_foods(
+        [food_id for food_id in ids.values() if food_id is not None],
+        [index for index in indices.values() if index is not None]
+    )
+    
+    not_found = {'error': 'Food not found'}
+    results = {
+        'ids': {
+            key: (by_id.get(food_id) or not_found) if food_id is not None else {'error': 'Invalid id format'}
+            for key, food_id in ids.items()
+        },
+        'indices': {
+            key: (by_index.get(index) or not_found) if index is not None else {'error': 'Invalid index format'}
+            for key, index in indices.items()
+        }
+    }
+    return Response(results)
+
+@api_view(['GET'])
+def food_query(request):
+    """
+    API endpoint to filter foods by ranges of nutrient values
+    
+    URL Parameters:
+    - <column>__<op>: Predicate on a numeric column, op is one of gt, gte,
+      lt, lte, eq (e.g. protein_g__gte=15&energy_kcal__lte=200)
+    - sort: Column to sort by, prefixed with - for descending
+    - fields: Comma separated columns to return for each food
+    - limit: Page size (default 20, at most 100)
+    - offset: Number of results to skip
+    
+    Returns:
+    - Total number of matching foods and the requested page
+    """
+    predicates = []
+    for key, value in request.GET.items():
+        column, _, operator = key.rpartition('__')
+        if not column or operator not in QUERY_OPERATORS:
+            continue
+        try:
+            predicates.append((column, operator, float(value)))
+        except ValueError:
+            return Response({'error': f'Invalid number for {key}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    sort = request.GET.get('sort') or None
+    descending = bool(sort) and sort.startswith('-')
+    if descending:
+        sort = sort[1:]
+    fields = [field for field in request.GET.get('fields', '').split(',') if field] or None
+    
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_QUERY_LIMIT))
+        offset = int(request.GET.get('offset', 0))
+    except ValueError:
+        return Response({'error': 'Invalid limit or offset format'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1 or offset < 0:
+        return Response({'error': 'limit must be positive and offset not negative'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(limit, MAX_QUERY_LIMIT)
+    
+    try:
+        count, results = query_foods(predicates, sort, descending, limit, offset, fields)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'count': count, 'limit': limit, 'offset': offset, 'results': results})
+
+@api_view(['GET'])
+def catalog_version(request):
+    """
+    API endpoint for the version of the food catalog being served
+    
+    Returns:
+    - Catalog version and number of foods
+    """
+    catalog = get_catalog()
+    return Response({'version': catalog.version, 'foods': len(catalog.by_index)})
+
 class AddFoodView(generics.CreateAPIView):
     """API endpoint to add food consumption"""
     serializer_class = FoodConsumptionSerializer
@@ -175,16 +371,66 @@ class AddFoodView(generics.CreateAPIView):
             
             serializer = self.get_serializer(data=consumption_data)
             serializer.is_valid(raise_exception=True)
-            serializer.save(user=request.user)
+            # The daily rollup is updated by a post_save receiver in this transaction
+            with transaction.atomic():
+                serializer.save(user=request.user)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except ValueError:
             return Response({"detail": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST)
 
+class AddMealView(generics.GenericAPIView):
+    """API endpoint to log several foods in one transaction"""
+    serializer_class = FoodConsumptionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, *args, **kwargs):
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "items must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_MEAL_ITEMS:
+            return Response(
+                {"detail": f"At most {MAX_MEAL_ITEMS} items can be logged at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validate every item before touching the catalog or the database
+        errors = {}
+        parsed = {}
+        for i, item in enumerate(items):
+            try:
+                parsed[i] = parse_meal_item(item)
+            except ValueError as e:
+                errors[i] = str(e)
+        
+        # Resolve all foods in one pass over the catalog
+        entries, missing = build_consumptions(request.user, parsed)
+        errors.update(missing)
+        
+        if errors:
+            return Response(
+                {"detail": "Invalid items", "errors": {str(i): error for i, error in sorted(errors.items())}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        with transaction.atomic():
+            created = FoodConsumption.objects.bulk_create([entries[i] for i in sorted(entries)])
+            # bulk_create sends no signals, so update the daily rollups,
+            # streak and sync log here
+            record_food(created)
+            record_changes(request.user.pk, 'food', [entry.pk for entry in created])
+            record_actions(request.user.pk, [entry.timestamp for entry in created])
+        
+        return Response({
+            'entries': self.get_serializer(created, many=True).data,
+            'day_totals': day_totals(request.user, timezone.localdate())
+        }, status=status.HTTP_201_CREATED)
+
 class FoodConsumptionListByDateView(generics.ListAPIView):
     """API endpoint to list food consumption by date range"""
     serializer_class = FoodConsumptionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         start_date = self.request.query_params.get('start_date')
@@ -210,4 +456,97 @@ class FoodConsumptionListByDateView(generics.ListAPIView):
             user=self.request.user,
             timestamp__gte=start_datetime, 
             timestamp__lte=end_datetime
-        ).order_by('timestamp')
+        ).order_by('timestamp', 'id')
+
+
+class DailySummaryView(generics.GenericAPIView):
+    """API endpoint for per-day nutrition and water totals against the daily goal"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        today = timezone.localdate()
+        try:
+            start_day = parse_date(request.query_params.get('start_date') or today.isoformat())
+            end_day = parse_date(request.query_params.get('end_date') or today.isoformat())
+        except ValueError:
+            start_day = end_day = None
+        if not start_day or not end_day:
+            return Response({"detail": "Invalid date format. Use YYYY-MM-DD format"}, status=status.HTTP_400_BAD_REQUEST)
+        if end_day < start_day:
+            return Response({"detail": "end_date must not be before start_date"}, status=status.HTTP_400_BAD_REQUEST)
+        if (end_day - start_day).days >= MAX_SUMMARY_DAYS:
+            return Response(
+                {"detail": f"Date range must not exceed {MAX_SUMMARY_DAYS} days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        goal = goal_for(request.user)
+        days = []
+        for day, totals in daily_totals(request.user, start_day, end_day).items():
+            days.append({
+                'date': day.isoformat(),
+                **totals,
+                'remaining': {field: goal[field] - totals[field] for field in NUTRIENT_TOTALS}
+            })
+        
+        return Response({
+            'start_date': start_day.isoformat(),
+            'end_date': end_day.isoformat(),
+            'goal': goal,
+            'days': days
+        })
+
+class TrendsView(generics.GenericAPIView):
+    """API endpoint for rolling averages, goal adherence and week over week changes"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        today = timezone.localdate()
+        try:
+            end_day = parse_date(request.query_params.get('end_date') or today.isoformat())
+            start_param = request.query_params.get('start_date')
+            start_day = parse_date(start_param) if start_param else (
+                end_day - timedelta(days=DEFAULT_TREND_DAYS - 1) if end_day else None
+            )
+        except ValueError:
+            start_day = end_day = None
+        if not start_day or not end_day:
+            return Response({"detail": "Invalid date format. Use YYYY-MM-DD format"}, status=status.HTTP_400_BAD_REQUEST)
+        if end_day < start_day:
+            return Response({"detail": "end_date must not be before start_date"}, status=status.HTTP_400_BAD_REQUEST)
+        if (end_day - start_day).days >= MAX_SUMMARY_DAYS:
+            return Response(
+                {"detail": f"Date range must not exceed {MAX_SUMMARY_DAYS} days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Read enough earlier days for the longest window to be full on start_day
+        history_days = max(TREND_WINDOWS) - 1
+        totals = daily_totals(request.user, start_day - timedelta(days=history_days), end_day)
+        goal = goal_for(request.user)
+        
+        return Response({
+            'start_date': start_day.isoformat(),
+            'end_date': end_day.isoformat(),
+            'goal': goal,
+            'logged_days': sum(1 for day, values in totals.items() if day >= start_day and values['items']),
+            'trends': compute_trends(totals, goal, history_days)
+        })
+
+class StreakView(generics.GenericAPIView):
+    """API endpoint for the user's consecutive-day logging streak"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        streak = UserStreak.objects.filter(user=request.user).values('streak', 'last_action_day').first()
+        if streak is None:
+            # Same as the contract's defaults for an address that never acted
+            return Response({'streak': 0, 'last_action_day': 0, 'last_action_date': None, 'active': False})
+        
+        today = action_day(timezone.now())
+        return Response({
+            **streak,
+            'last_action_date': (EPOCH + timedelta(days=streak['last_action_day'])).isoformat(),
+            # A streak is broken once a whole day passes without an action
+            'active': streak['last_action_day'] >= today - 1
+        })
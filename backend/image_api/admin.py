@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ImageUpload, PredictionFeedback
+from .models import ImageUpload, InferenceJob, InferenceWorker, PredictionFeedback
 
 @admin.register(ImageUpload)
 class ImageUploadAdmin(admin.ModelAdmin):
@@ -8,6 +8,19 @@ class ImageUploadAdmin(admin.ModelAdmin):
     search_fields = ('id', 'user__username', 'prediction')
     readonly_fields = ('timestamp', 'prediction_id')
 
+@admin.register(InferenceJob)
+class InferenceJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'upload', 'status', 'attempts', 'worker', 'created', 'finished')
+    list_filter = ('status',)
+    search_fields = ('id', 'upload__user__username', 'worker')
+    readonly_fields = ('created', 'started', 'finished')
+
+@admin.register(InferenceWorker)
+class InferenceWorkerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'started', 'heartbeat')
+    search_fields = ('name',)
+    readonly_fields = ('started', 'heartbeat')
+
 @admin.register(PredictionFeedback)
 class PredictionFeedbackAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'timestamp')
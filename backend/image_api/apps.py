@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ImageApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'image_api'
+
+    def ready(self):
+        # Inference workers load the model themselves; web processes only
+        # do when IMAGE_MODEL_PRELOAD is set
+        from django.conf import settings
+        from .model_registry import can_load_models, preload_models
+        if getattr(settings, 'IMAGE_MODEL_PRELOAD', False) and can_load_models():
+            preload_models()
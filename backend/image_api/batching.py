@@ -0,0 +1,101 @@
+"""
+Dynamic micro-batching of model inference
+
+Callers in any thread submit one image at a time. A single batching thread
+collects the images that arrive within max_wait seconds of the first one
+(or until max_batch_size are waiting), runs them through the model in one
+call and hands each caller its own result. Under a burst of uploads this
+turns many single-image predicts into a few batched ones; a lone request
+only waits max_wait.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+# Most images run through the model in one call
+MAX_BATCH_SIZE = getattr(settings, 'INFERENCE_MAX_BATCH_SIZE', 8)
+
+# Seconds the first image of a batch waits for others to join it
+MAX_BATCH_WAIT = getattr(settings, 'INFERENCE_MAX_BATCH_WAIT', 0.015)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-item predictions into batched calls
+
+    Parameters:
+    - predict_batch: Function of a list of items returning a list of results
+      in the same order
+    - max_batch_size: Most items passed to one predict_batch call
+    - max_wait: Seconds to wait for a batch to fill once its first item came
+
+    Attributes:
+    - batches: Number of predict_batch calls made
+    - items: Number of items predicted
+    """
+
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_BATCH_WAIT):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        """Queue item for prediction and return a Future of its result"""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        """Predict a single item, blocking until its batch has run"""
+        return self.submit(item).result(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Block for the next item, then gather more until the batch is full or max_wait passed"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Callers that gave up (cancelled futures) are left out of the batch
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.predict_batch([item for item, future in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"predict_batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for item, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (item, future), result in zip(batch, results):
+                future.set_result(result)
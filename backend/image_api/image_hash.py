@@ -0,0 +1,127 @@
+"""
+Perceptual hashes of uploaded images and a cache of their predictions
+
+Every upload gets a 64-bit difference hash (dHash): the image is shrunk to
+9x8 grayscale and each bit tells whether a pixel is brighter than its right
+neighbour. Re-encoded, resized or slightly recompressed copies of a photo
+land within a few bits of each other, so an upload whose hash is within
+IMAGE_HASH_MAX_DISTANCE bits of a recently predicted one reuses that
+prediction instead of running the model.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .models import InferenceJob
+
+# Most differing bits for two hashes to count as the same photo
+HASH_MAX_DISTANCE = getattr(settings, 'IMAGE_HASH_MAX_DISTANCE', 4)
+
+# Predictions kept in each process's LRU cache
+PREDICTION_CACHE_SIZE = getattr(settings, 'IMAGE_PREDICTION_CACHE_SIZE', 4096)
+
+# Side of the grid compared by dHash, giving HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 8
+
+
+def dhash(image):
+    """
+    Difference hash of an image
+
+    Parameters:
+    - image: PIL image, or a path or file object Pillow can open
+
+    Returns:
+    - Hash as a 16 character hex string
+    """
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return dhash(opened)
+    # draft() lets JPEG decoding skip most of the full-resolution work
+    image.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+    pixels = np.asarray(
+        image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS), dtype=np.int16
+    )
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = int.from_bytes(np.packbits(bits).tobytes(), 'big')
+    return f'{value:016x}'
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hex hashes"""
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU mapping of image hashes to prediction results
+
+    Lookups return the result of an exactly matching hash, or else of the
+    closest cached hash within max_distance bits.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, max_distance=HASH_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_hash):
+        with self._lock:
+            key = int(image_hash, 16)
+            if key not in self._entries:
+                key = self._nearest(key)
+                if key is None:
+                    return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, image_hash, result):
+        with self._lock:
+            key = int(image_hash, 16)
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _nearest(self, key):
+        best, best_distance = None, self.max_distance + 1
+        for cached in self._entries:
+            distance = (key ^ cached).bit_count()
+            if distance < best_distance:
+                best, best_distance = cached, distance
+        return best
+
+
+prediction_cache = PredictionCache()
+
+
+def cached_prediction(image_hash):
+    """
+    Prediction of an earlier upload of the same or a near-identical image
+
+    Near matches are searched in this process's cache; on a miss, exact
+    matches are looked up through the image_hash index so uploads predicted
+    by other processes are found too.
+    """
+    if not image_hash:
+        return None
+    result = prediction_cache.get(image_hash)
+    if result is not None:
+        return result
+    result = InferenceJob.objects.filter(
+        upload__image_hash=image_hash, status=InferenceJob.DONE
+    ).order_by('-finished').values_list('result', flat=True).first()
+    if result is not None:
+        prediction_cache.put(image_hash, result)
+    return result
@@ -0,0 +1,233 @@
+"""
+Database-backed queue of image inference jobs
+
+Upload requests only insert an InferenceJob; a pool of worker processes
+(manage.py run_inference_workers) claims queued jobs, runs the model and
+stores the result on the job and its ImageUpload. Claims are a conditional
+UPDATE on the job's status, so any number of workers can share the queue
+without an external broker.
+"""
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .image_hash import cached_prediction, prediction_cache
+from .models import ImageUpload, InferenceJob, InferenceWorker
+from .uploads import decode_model_input, load_model_input
+
+# Seconds an idle worker sleeps between polls of the queue
+JOB_POLL_INTERVAL = getattr(settings, 'INFERENCE_JOB_POLL_INTERVAL', 0.5)
+
+# Seconds after which a running job whose worker went away is queued again
+JOB_STALE_AFTER = getattr(settings, 'INFERENCE_JOB_STALE_AFTER', 300)
+
+# Attempts before a job that keeps failing or stalling is marked failed
+JOB_MAX_ATTEMPTS = getattr(settings, 'INFERENCE_JOB_MAX_ATTEMPTS', 3)
+
+# Seconds between a worker's heartbeats, and since its last one after which
+# it no longer counts as live
+WORKER_HEARTBEAT_INTERVAL = getattr(settings, 'INFERENCE_WORKER_HEARTBEAT_INTERVAL', 10)
+WORKER_HEARTBEAT_TIMEOUT = getattr(settings, 'INFERENCE_WORKER_HEARTBEAT_TIMEOUT', 30)
+
+
+def enqueue(upload, model_input=None):
+    """
+    Queue inference for an ImageUpload and return its job
+
+    model_input is the upload already encoded at the model's input size (see
+    uploads.process_upload); without it the worker reads the stored image.
+
+    When the same or a near-identical image was predicted before, the job
+    is created already done with that prediction and never reaches a worker.
+    """
+    result = cached_prediction(upload.image_hash)
+    if result is None:
+        return InferenceJob.objects.create(upload=upload, model_input=model_input)
+    now = timezone.now()
+    with transaction.atomic():
+        job = InferenceJob.objects.create(
+            upload=upload, status=InferenceJob.DONE, result=result, started=now, finished=now
+        )
+        ImageUpload.objects.filter(pk=upload.pk).update(prediction=result.get('class'))
+    upload.prediction = result.get('class')
+    return job
+
+
+def claim_next(worker):
+    """
+    Claim the oldest queued job for worker
+
+    Returns:
+    - The claimed InferenceJob, or None when the queue is empty
+    """
+    while True:
+        candidates = list(
+            InferenceJob.objects.filter(status=InferenceJob.QUEUED).order_by('created').values_list('pk', flat=True)[:5]
+        )
+        if not candidates:
+            return None
+        for pk in candidates:
+            # Only one worker's UPDATE can move the job out of QUEUED
+            claimed = InferenceJob.objects.filter(pk=pk, status=InferenceJob.QUEUED).update(
+                status=InferenceJob.RUNNING, worker=worker, started=timezone.now(), attempts=F('attempts') + 1
+            )
+            if claimed:
+                return InferenceJob.objects.select_related('upload').get(pk=pk)
+
+
+def complete(job, result):
+    """Store a finished job's result and the prediction on its upload"""
+    with transaction.atomic():
+        InferenceJob.objects.filter(pk=job.pk).update(
+            status=InferenceJob.DONE, result=result, error='', finished=timezone.now(), model_input=None
+        )
+        ImageUpload.objects.filter(pk=job.upload_id).update(prediction=result.get('class'))
+    if job.upload.image_hash:
+        prediction_cache.put(job.upload.image_hash, result)
+
+
+def fail(job, error):
+    """Queue a failed job again, or mark it failed after JOB_MAX_ATTEMPTS"""
+    status = InferenceJob.FAILED if job.attempts >= JOB_MAX_ATTEMPTS else InferenceJob.QUEUED
+    InferenceJob.objects.filter(pk=job.pk).update(
+        status=status, error=error, finished=timezone.now() if status == InferenceJob.FAILED else None
+    )
+
+
+def requeue_stale():
+    """Return jobs whose worker stopped mid-run to the queue"""
+    cutoff = timezone.now() - timedelta(seconds=JOB_STALE_AFTER)
+    stale = InferenceJob.objects.filter(status=InferenceJob.RUNNING, started__lt=cutoff)
+    failed = stale.filter(attempts__gte=JOB_MAX_ATTEMPTS).update(
+        status=InferenceJob.FAILED, error="Worker stopped responding", finished=timezone.now()
+    )
+    return failed + stale.update(status=InferenceJob.QUEUED)
+
+
+def heartbeat(worker):
+    """Record that worker is running with its model loaded"""
+    InferenceWorker.objects.update_or_create(name=worker, defaults={'heartbeat': timezone.now()})
+
+
+def live_workers():
+    """Number of worker loops that sent a heartbeat within WORKER_HEARTBEAT_TIMEOUT"""
+    cutoff = timezone.now() - timedelta(seconds=WORKER_HEARTBEAT_TIMEOUT)
+    return InferenceWorker.objects.filter(heartbeat__gte=cutoff).count()
+
+
+def run_job(job, predict):
+    """Run predict on a claimed job's model input image and record the outcome"""
+    # A duplicate queued before its original finished skips the model
+    result = cached_prediction(job.upload.image_hash)
+    if result is not None:
+        complete(job, result)
+        return True
+    try:
+        if job.model_input:
+            image = decode_model_input(job.model_input)
+        else:
+            image = load_model_input(job.upload.image)
+        result = predict(image)
+    except Exception:
+        fail(job, traceback.format_exc(limit=5))
+        return False
+    complete(job, result)
+    return True
+
+
+def worker_name(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def run_worker(index=0, predict=None, max_jobs=None, stop=None):
+    """
+    Process queued jobs until stop is set or SIGTERM arrives (or max_jobs are done)
+
+    The model is loaded and warmed up before the first claim, so a job is
+    never held while the worker is still starting.
+    """
+    if stop is not None and stop.is_set():
+        return 0
+    if predict is None:
+        from .model_registry import get_model
+        from .prediction import predict_image_array
+        get_model()
+        predict = predict_image_array
+
+    if stop is None:
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+
+    name = worker_name(index)
+    done = 0
+    last_stale_check = 0.0
+    last_heartbeat = 0.0
+    try:
+        while not stop.is_set() and (max_jobs is None or done < max_jobs):
+            close_old_connections()
+            if time.monotonic() - last_heartbeat > WORKER_HEARTBEAT_INTERVAL:
+                heartbeat(name)
+                last_heartbeat = time.monotonic()
+            if time.monotonic() - last_stale_check > JOB_POLL_INTERVAL * 20:
+                requeue_stale()
+                last_stale_check = time.monotonic()
+            job = claim_next(name)
+            if job is None:
+                stop.wait(JOB_POLL_INTERVAL)
+                continue
+            run_job(job, predict)
+            done += 1
+    finally:
+        if last_heartbeat:
+            InferenceWorker.objects.filter(name=name).delete()
+        close_old_connections()
+    return done
+
+
+def run_worker_threads(index=0, threads=1, stop=None):
+    """
+    Run several job loops in this process sharing one model
+
+    Their predicts meet in the process-wide MicroBatcher, so a burst of
+    queued uploads is run through the model in batches. Without a stop
+    event the loops run until SIGTERM.
+    """
+    if threads <= 1:
+        return run_worker(index, stop=stop)
+    if stop is not None and stop.is_set():
+        return 0
+
+    from .model_registry import get_model
+    from .prediction import predict_image_array
+    get_model()
+
+    if stop is None:
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    loops = [
+        threading.Thread(
+            target=run_worker, name=f'inference-worker-{index}-{thread}',
+            kwargs={'index': f'{index}.{thread}', 'predict': predict_image_array, 'stop': stop}
+        )
+        for thread in range(threads)
+    ]
+    for loop in loops:
+        loop.start()
+    try:
+        # Wake up regularly so KeyboardInterrupt reaches the main thread
+        while any(loop.is_alive() for loop in loops):
+            for loop in loops:
+                loop.join(0.5)
+    finally:
+        stop.set()
+        for loop in loops:
+            loop.join()
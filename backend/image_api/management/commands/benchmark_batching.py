@@ -0,0 +1,118 @@
+import statistics
+import threading
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from image_api.batching import MAX_BATCH_WAIT, MicroBatcher
+from image_api.model_registry import DEFAULT_IMAGE_SIZE, MODEL_PATH, can_load_models, get_model, model_image_size
+
+
+class SyntheticClassifier:
+    """
+    NumPy stand-in for the food model when best.pt or ultralytics is missing
+
+    Pools each image to a 32x32 grid and runs a two-layer perceptron with
+    101 outputs, so cost grows with the batch like a real CPU forward pass
+    (one BLAS call per layer for the whole batch).
+    """
+
+    def __init__(self, classes=101, hidden=1024, seed=0):
+        rng = np.random.default_rng(seed)
+        self.hidden = rng.standard_normal((32 * 32 * 3, hidden)).astype(np.float32) / 55
+        self.output = rng.standard_normal((hidden, classes)).astype(np.float32) / 32
+
+    def predict(self, images):
+        batch = np.stack(images).astype(np.float32) / 255
+        n, height, width, channels = batch.shape
+        pooled = batch.reshape(n, 32, height // 32, 32, width // 32, channels).mean(axis=(2, 4))
+        logits = np.maximum(pooled.reshape(n, -1) @ self.hidden, 0) @ self.output
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+class Command(BaseCommand):
+    help = "Measure inference throughput against the micro-batcher's max batch size"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-sizes', default='1,2,4,8,16',
+            help="Comma separated max batch sizes to compare"
+        )
+        parser.add_argument('--requests', type=int, default=256, help="Images predicted per batch size")
+        parser.add_argument('--clients', type=int, default=32, help="Concurrent callers submitting images")
+        parser.add_argument(
+            '--max-wait', type=float, default=MAX_BATCH_WAIT,
+            help="Seconds a batch waits to fill"
+        )
+        parser.add_argument(
+            '--synthetic', action='store_true',
+            help="Use a NumPy stand-in model instead of best.pt"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            batch_sizes = [int(size) for size in options['batch_sizes'].split(',')]
+        except ValueError:
+            raise CommandError("--batch-sizes must be comma separated integers")
+        if any(size < 1 for size in batch_sizes):
+            raise CommandError("--batch-sizes must be positive")
+
+        if options['synthetic']:
+            model = SyntheticClassifier()
+            size = DEFAULT_IMAGE_SIZE
+            predict_batch = model.predict
+            self.stdout.write("Model: synthetic NumPy classifier")
+        else:
+            if not can_load_models():
+                raise CommandError(f"Cannot load {MODEL_PATH}; install ultralytics or pass --synthetic")
+            loaded = get_model()
+            size = model_image_size(loaded.model)
+            predict_batch = lambda images: loaded.model.predict(images, verbose=False)
+            self.stdout.write(f"Model: {MODEL_PATH}")
+
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(16)]
+        self.stdout.write(
+            f"{options['requests']} images of {size}x{size} from {options['clients']} clients, "
+            f"max wait {options['max_wait'] * 1000:g} ms"
+        )
+        self.stdout.write(f"{'batch':>6} {'images/s':>10} {'mean batch':>11} {'p50 ms':>8} {'p95 ms':>8}")
+
+        for batch_size in batch_sizes:
+            batcher = MicroBatcher(predict_batch, max_batch_size=batch_size, max_wait=options['max_wait'])
+            # Warm up outside the measurement
+            batcher.predict(images[0])
+            batcher.batches = batcher.items = 0
+
+            latencies = []
+            remaining = iter(range(options['requests']))
+            lock = threading.Lock()
+
+            def client():
+                while True:
+                    with lock:
+                        index = next(remaining, None)
+                    if index is None:
+                        return
+                    start = time.perf_counter()
+                    batcher.predict(images[index % len(images)])
+                    latencies.append(time.perf_counter() - start)
+
+            clients = [threading.Thread(target=client) for _ in range(options['clients'])]
+            start = time.perf_counter()
+            for thread in clients:
+                thread.start()
+            for thread in clients:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            latencies.sort()
+            p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+            self.stdout.write(
+                f"{batch_size:>6} {len(latencies) / elapsed:>10.1f} {batcher.items / batcher.batches:>11.2f} "
+                f"{statistics.median(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
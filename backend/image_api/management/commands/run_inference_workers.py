@@ -0,0 +1,68 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def _worker(index, threads, ready, stop=None):
+    # Spawned children start a fresh interpreter and set Django up themselves;
+    # image_api.jobs imports models, so it can only be imported afterwards
+    import django
+    django.setup()
+    from image_api.jobs import run_worker_threads
+    ready.set()
+    run_worker_threads(index, threads, stop=stop)
+
+
+class Command(BaseCommand):
+    help = "Run image inference workers that process queued prediction jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help="Number of worker processes, each loading its own model"
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help="Job loops per process; their predicts are micro-batched on the process's model"
+        )
+
+    def handle(self, *args, **options):
+        from image_api.jobs import run_worker_threads
+
+        processes = max(options['processes'], 1)
+        threads = max(options['threads'], 1)
+        if processes == 1:
+            self.stdout.write(self.style.SUCCESS(f"Inference worker started ({threads} job threads)"))
+            run_worker_threads(0, threads)
+            return
+
+        # Children must not inherit this process's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        ready = [context.Event() for index in range(processes)]
+        workers = [
+            context.Process(target=_worker, args=(index, threads, ready[index]), daemon=True)
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            # Only report the pool as started once every child has set Django up
+            for index, (worker, event) in enumerate(zip(workers, ready)):
+                while not event.wait(0.5):
+                    if not worker.is_alive():
+                        raise CommandError(f"Inference worker {index} exited during startup (exit code {worker.exitcode})")
+            self.stdout.write(self.style.SUCCESS(f"Started {processes} inference workers"))
+            for worker in workers:
+                worker.join()
+            failed = [index for index, worker in enumerate(workers) if worker.exitcode]
+            if failed:
+                raise CommandError(f"Inference workers {', '.join(map(str, failed))} exited with an error")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_api', '0002_imageupload_image_user_timestamp_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InferenceJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('worker', models.CharField(blank=True, help_text='Worker that claimed the job', max_length=100)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('upload', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='image_api.imageupload')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created'], name='inference_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.20 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_api', '0003_inferencejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageupload',
+            name='image_hash',
+            field=models.CharField(blank=True, help_text='Perceptual hash (dHash) of the image as hex', max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='imageupload',
+            index=models.Index(fields=['image_hash'], name='image_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_api', '0004_imageupload_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inferencejob',
+            name='model_input',
+            field=models.BinaryField(blank=True, help_text="Image encoded at the model's input size, cleared once done", null=True),
+        ),
+    ]
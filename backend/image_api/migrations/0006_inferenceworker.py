@@ -0,0 +1,22 @@
+# Generated by Django 4.2.20 on 2026-10-17 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_api', '0005_inferencejob_model_input'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InferenceWorker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('started', models.DateTimeField(auto_now_add=True)),
+                ('heartbeat', models.DateTimeField()),
+            ],
+        ),
+    ]
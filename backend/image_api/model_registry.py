@@ -0,0 +1,172 @@
+"""
+Process-wide registry of loaded YOLO models
+
+Each model is deserialized once per worker process, on first use or by
+preload_models() at startup, and warmed up with one inference on a blank
+image so graph setup and allocator warmup are not paid by the first upload.
+ultralytics is only imported when a model is actually loaded.
+"""
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+MODEL_PATH = Path(__file__).resolve().parent / "best.pt"
+
+# Side of the blank warmup image when the model does not record its input size
+DEFAULT_IMAGE_SIZE = 224
+
+# Model states reported by ModelRegistry.status()
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+def load_yolo(model_path):
+    """Load a trained YOLO model from its weights file"""
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def model_image_size(model):
+    """Input image side the model was trained with"""
+    size = getattr(model, 'overrides', {}).get('imgsz') or DEFAULT_IMAGE_SIZE
+    if isinstance(size, (list, tuple)):
+        size = max(size)
+    return int(size)
+
+
+def warm_up(model):
+    """Run one inference on a blank image of the model's input size"""
+    size = model_image_size(model)
+    model.predict(np.zeros((size, size, 3), dtype=np.uint8), verbose=False)
+
+
+class LoadedModel:
+    """
+    A loaded model with its load statistics
+
+    Attributes:
+    - model: The model object
+    - lock: Serializes inference, YOLO predictors are not thread-safe
+    - load_seconds: Time spent deserializing the weights
+    - warmup_seconds: Time spent on the warmup inference
+    """
+
+    def __init__(self, model, load_seconds, warmup_seconds):
+        self.model = model
+        self.lock = threading.Lock()
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+
+
+class ModelRegistry:
+    """
+    Thread-safe, lazily filled mapping of model paths to loaded models
+
+    Parameters:
+    - loader: Function of a path returning a model, load_yolo by default
+    - warmup: Function run once on every freshly loaded model
+    """
+
+    def __init__(self, loader=load_yolo, warmup=warm_up):
+        self._loader = loader
+        self._warmup = warmup
+        self._models = {}
+        self._states = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._path_locks = {}
+
+    def get(self, path=MODEL_PATH):
+        """Return the LoadedModel for path, loading it if this process has not yet"""
+        key = str(path)
+        loaded = self._models.get(key)
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            path_lock = self._path_locks.setdefault(key, threading.Lock())
+        # Only callers of the same path wait for its load
+        with path_lock:
+            loaded = self._models.get(key)
+            if loaded is not None:
+                return loaded
+            self._states[key] = LOADING
+            try:
+                start = time.perf_counter()
+                model = self._loader(path)
+                loaded_at = time.perf_counter()
+                if self._warmup is not None:
+                    self._warmup(model)
+                warmed_at = time.perf_counter()
+            except Exception as e:
+                self._states[key] = FAILED
+                self._errors[key] = str(e)
+                raise
+            loaded = LoadedModel(model, loaded_at - start, warmed_at - loaded_at)
+            self._models[key] = loaded
+            self._states[key] = READY
+            self._errors.pop(key, None)
+            return loaded
+
+    def is_ready(self, path=MODEL_PATH):
+        return str(path) in self._models
+
+    def status(self):
+        """Dictionary of model path to its state, error and timings"""
+        status = {}
+        for key, state in list(self._states.items()):
+            entry = {'state': state}
+            if state == FAILED:
+                entry['error'] = self._errors.get(key)
+            loaded = self._models.get(key)
+            if loaded is not None:
+                entry['load_seconds'] = round(loaded.load_seconds, 3)
+                entry['warmup_seconds'] = round(loaded.warmup_seconds, 3)
+            status[key] = entry
+        return status
+
+    def clear(self):
+        """Forget every loaded model, e.g. after the weights file was replaced"""
+        with self._lock:
+            self._models.clear()
+            self._states.clear()
+            self._errors.clear()
+
+
+registry = ModelRegistry()
+
+
+def get_model(path=MODEL_PATH):
+    """Return the process-wide LoadedModel for path"""
+    return registry.get(path)
+
+
+def can_load_models(path=MODEL_PATH):
+    """Whether the weights file and ultralytics are both available"""
+    return Path(path).exists() and importlib.util.find_spec('ultralytics') is not None
+
+
+def preload_models(paths=(MODEL_PATH,), background=True):
+    """
+    Load and warm up models ahead of the first request
+
+    With background set, loading happens on a daemon thread so startup is not
+    blocked; registry.is_ready() tells when a model can serve.
+    """
+    def load():
+        for path in paths:
+            try:
+                registry.get(path)
+            except Exception as e:
+                print(f"Error loading model {path}: {e}")
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name='model-preload', daemon=True)
+    thread.start()
+    return thread
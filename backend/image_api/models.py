@@ -13,10 +13,59 @@ class ImageUpload(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     prediction = models.CharField(max_length=255, null=True, blank=True)
     prediction_id = models.UUIDField(default=uuid.uuid4, editable=False)
+    image_hash = models.CharField(max_length=16, null=True, blank=True, help_text="Perceptual hash (dHash) of the image as hex")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='image_user_timestamp_idx'),
+            models.Index(fields=['image_hash'], name='image_hash_idx'),
+        ]
     
     def __str__(self):
         return f"Image {self.id} - {self.prediction or 'No prediction'}"
 
+class InferenceJob(models.Model):
+    """Queued food prediction for an uploaded image, run by an inference worker"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    upload = models.OneToOneField(ImageUpload, on_delete=models.CASCADE, related_name='job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    model_input = models.BinaryField(null=True, blank=True, help_text="Image encoded at the model's input size, cleared once done")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, help_text="Worker that claimed the job")
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created'], name='inference_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Inference job {self.id} for Image {self.upload_id} - {self.status}"
+
+class InferenceWorker(models.Model):
+    """Heartbeat of a running inference worker loop whose model is loaded"""
+    name = models.CharField(max_length=100, unique=True)
+    started = models.DateTimeField(auto_now_add=True)
+    heartbeat = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Inference worker {self.name}"
+
 class PredictionFeedback(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='prediction_feedbacks')
     # image = models.ForeignKey(ImageUpload, on_delete=models.CASCADE, related_name='feedbacks')
@@ -4,11 +4,10 @@ import json
 import numpy as np
 from pathlib import Path
 from PIL import Image
-from ultralytics import YOLO
-import cv2
-MODEL_PATH = Path(__file__).resolve().parent / "best.pt"
-CSV_PATH = Path(__file__).resolve().parent / "nutrient_values.csv"
-import pandas as pd
+import threading
+from .batching import MicroBatcher
+from .model_registry import MODEL_PATH, get_model
+from .searchNutrients import get_nutrient_table
 
 
 # Dictionary mapping food names to nutritional information (calories per 100g)
@@ -23,18 +22,9 @@ NUTRITION_INFO = {
     # Add more foods as needed
 }
 
-def load_model(model_path):
-    """
-    Load a trained YOLO model
-    
-    Args:
-        model_path: Path to the trained model weights
-        
-    Returns:
-        Loaded YOLO model
-    """
-    model = YOLO(model_path)
-    return model
+# One MicroBatcher per model path, created on first use
+_batchers = {}
+_batchers_lock = threading.Lock()
 
 def preprocess_image(image_path):
     """
@@ -46,29 +36,24 @@ def preprocess_image(image_path):
     Returns:
         Preprocessed image
     """
+    # Imported here so importing this module never pulls in OpenCV
+    import cv2
     image = cv2.imread(image_path)
     if image is None:
         raise ValueError(f"Could not read image {image_path}")
     
     return image
 
-def predict_food(model, image, conf_threshold=0.25):
+def summarize_result(result):
     """
-    Predict food class for an image
+    Rank the class probabilities of one YOLO result
     
     Args:
-        model: Trained YOLO model
-        image: Input image (numpy array)
-        conf_threshold: Confidence threshold for predictions
+        result: Classification result of a single image
         
     Returns:
         Dictionary with prediction results
     """
-    # Run inference
-    results = model.predict(image, conf=conf_threshold)
-    result = results[0]  # Get first result (only one image)
-    
-    # Process predictions
     predictions = []
     for i, prob in enumerate(result.probs.data):
         class_id = int(i)
@@ -98,6 +83,50 @@ def predict_food(model, image, conf_threshold=0.25):
         "all_predictions": predictions
     }
 
+def predict_food(model, image, conf_threshold=0.25):
+    """
+    Predict food class for an image
+    
+    Args:
+        model: Trained YOLO model
+        image: Input image (numpy array)
+        conf_threshold: Confidence threshold for predictions
+        
+    Returns:
+        Dictionary with prediction results
+    """
+    return predict_food_batch(model, [image], conf_threshold)[0]
+
+def predict_food_batch(model, images, conf_threshold=0.25):
+    """
+    Predict food classes for several images in one model call
+    
+    Args:
+        model: Trained YOLO model
+        images: List of input images (numpy arrays)
+        conf_threshold: Confidence threshold for predictions
+        
+    Returns:
+        List of prediction dictionaries, in the order of images
+    """
+    results = model.predict(images, conf=conf_threshold, verbose=False)
+    return [summarize_result(result) for result in results]
+
+def get_batcher(model_path=MODEL_PATH):
+    """Process-wide MicroBatcher running the model at model_path"""
+    key = str(model_path)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                def predict_batch(images):
+                    loaded = get_model(model_path)
+                    with loaded.lock:
+                        return predict_food_batch(loaded.model, images)
+                batcher = _batchers[key] = MicroBatcher(predict_batch)
+    return batcher
+
 def process_image_file(model, image_path, output_dir=None, save_json=False):
     """
     Process a single image file
@@ -141,36 +170,37 @@ def process_image_file(model, image_path, output_dir=None, save_json=False):
     
     return top_pred
 
-df = pd.read_csv(CSV_PATH)
-
 def get_nutrition_by_dish(dish_name):
-    # Read the CSV
-
     # Find the row matching the dish name
-    row = df[df['dish_name'] == dish_name]
+    row = get_nutrient_table().get(dish_name)
 
-    if row.empty:
+    if row is None:
         return {"error": f"Dish '{dish_name}' not found."}
 
-    # Convert the row to a dictionary
-    result = row.iloc[0].to_dict()
-    return result
+    # A new dictionary per lookup, callers may modify it
+    return row
 
 def predict_image_content(image_path):
     
     
-    # Load model
-    model = load_model(MODEL_PATH)
-    
-    # Process image
-    top_prediction = process_image_file(
-        model=model, 
-        image_path=image_path, 
-    )
-    
-    # Example prediction categories
+    # Decode outside the batcher so only model calls are serialized
+    return predict_image_array(preprocess_image(image_path))
+
+def predict_image_array(image):
+    """
+    Predict the food in an already decoded image
     
-    # Simulate prediction by randomly selecting a category
+    Args:
+        image: BGR image (numpy array), ideally already at the model's input size
+        
+    Returns:
+        Dictionary with the top class, its confidence and nutrition
+    """
+    # Concurrent callers share batched predicts on the process-wide model
+    predictions = get_batcher(MODEL_PATH).predict(image)
+    top_prediction = predictions["top_prediction"]
+    if top_prediction is None:
+        raise ValueError("No predictions for image")
     
     return {
         "class": top_prediction["class_name"],
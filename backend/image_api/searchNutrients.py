@@ -1,5 +1,83 @@
 import csv
 import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from food.catalog_file import CatalogFile, column_cells, file_digest, read_csv, parse_float
+
+NUTRIENT_CSV_PATH = Path(__file__).resolve().parent / "nutrient_values.csv"
+NUTRIENT_CATALOG_PATH = Path(__file__).resolve().parent / "nutrient_values.bin"
+NUTRIENT_TEXT_COLUMNS = ('dish_name',)
+
+_nutrient_table = None
+_nutrient_table_lock = threading.Lock()
+
+class NutrientTable:
+    """
+    Nutrient values by dish_name, served from one float block
+
+    With the compiled catalog the block is a view of the memory-mapped file,
+    so worker processes share its pages; only the dish_name -> position
+    dict is built per process. Rows are assembled when looked up.
+    """
+
+    def __init__(self, header, rows, values=None):
+        header = [name.lstrip('\ufeff') for name in header]
+        numeric = [j for j, name in enumerate(header) if name not in NUTRIENT_TEXT_COLUMNS]
+        self.columns = [header[j] for j in numeric]
+        if values is None:
+            values = np.array(
+                [[parse_float(row[j]) if j < len(row) else np.nan for row in rows] for j in numeric],
+                dtype=np.float64
+            ).reshape(len(numeric), len(rows))
+        self.values = values
+
+        self.positions = {}
+        for position, dish_name in enumerate(column_cells(rows, header.index('dish_name'))):
+            if dish_name is not None:
+                self.positions.setdefault(dish_name, position)
+
+    def get(self, dish_name, default=None):
+        """Row of dish_name as a new dictionary, or default"""
+        position = self.positions.get(dish_name)
+        if position is None:
+            return default
+        row = {'dish_name': dish_name}
+        row.update(zip(self.columns, self.values[:, position].tolist()))
+        return row
+
+    def __contains__(self, dish_name):
+        return dish_name in self.positions
+
+    def __len__(self):
+        return len(self.positions)
+
+def load_nutrient_table():
+    """
+    Nutrient table read from the compiled nutrient catalog when it is up to
+    date, otherwise from the CSV
+    """
+    compiled = None
+    try:
+        compiled = CatalogFile.open_if_fresh(NUTRIENT_CATALOG_PATH, file_digest(NUTRIENT_CSV_PATH))
+    except Exception as e:
+        print(f"Error loading compiled nutrient catalog, using CSV: {e}")
+
+    if compiled is not None:
+        return NutrientTable(compiled.header, compiled.rows, compiled.values)
+    header, rows = read_csv(NUTRIENT_CSV_PATH)
+    return NutrientTable(header, rows)
+
+def get_nutrient_table():
+    """Return the process-wide nutrient table, loading it on first use"""
+    global _nutrient_table
+    if _nutrient_table is None:
+        with _nutrient_table_lock:
+            if _nutrient_table is None:
+                _nutrient_table = load_nutrient_table()
+    return _nutrient_table
 
 def get_row_as_json(search_value, csv_file_path=r"backend\image_api\nutrient_values.csv",search_column="dish_name"):
     try:
@@ -1,3 +1,248 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from PIL import Image
+
+from backend.testing import QueryPlanAssertionsMixin
+from food.catalog_file import CatalogFile, compile_csv, read_csv
+from . import jobs
+from .batching import MicroBatcher
+from .image_hash import PredictionCache, dhash, hamming_distance, prediction_cache
+from .models import ImageUpload, InferenceJob, InferenceWorker
+from .searchNutrients import NUTRIENT_CSV_PATH, NUTRIENT_TEXT_COLUMNS, NutrientTable
+from .uploads import STORE_MAX_BYTES, STORE_MAX_SIDE, decode_model_input, process_upload
+
+
+def photo(width, height, format='PNG'):
+    """Encoded smooth random image, standing in for a photo"""
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)).resize((width, height), Image.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format, quality=95)
+    return buffer.getvalue()
+
+
+class ImageUploadQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """A user's upload history must walk the (user, timestamp) index, never scan or sort"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create(username=f'user{i}') for i in range(5)]
+        cls.user = users[0]
+        ImageUpload.objects.bulk_create([
+            ImageUpload(user=user, image=f'images/{user.pk}-{i}.jpg')
+            for user in users for i in range(200)
+        ])
+
+    def test_user_image_list(self):
+        # Same queryset as UserImageListView
+        with self.assertIndexedQueries('image_api_imageupload'):
+            list(ImageUpload.objects.filter(user=self.user).order_by('-timestamp')[:20])
+
+
+class InferenceJobQueueTests(TestCase):
+    """Jobs are claimed once, oldest first, and retried until JOB_MAX_ATTEMPTS"""
+
+    def setUp(self):
+        user = User.objects.create(username='user')
+        self.jobs = [
+            jobs.enqueue(ImageUpload.objects.create(user=user, image=f'images/{i}.jpg'), model_input=photo(224, 224))
+            for i in range(2)
+        ]
+
+    def test_claim_order_and_exclusivity(self):
+        first = jobs.claim_next('a')
+        second = jobs.claim_next('b')
+        self.assertEqual([first.pk, second.pk], [job.pk for job in self.jobs])
+        self.assertEqual((first.status, first.worker, first.attempts), (InferenceJob.RUNNING, 'a', 1))
+        self.assertIsNone(jobs.claim_next('c'))
+
+    def test_result_is_stored_on_upload(self):
+        job = jobs.claim_next('a')
+        self.assertTrue(jobs.run_job(job, lambda image: {'class': 'idli', 'shape': image.shape}))
+        job.refresh_from_db()
+        self.assertEqual(job.status, InferenceJob.DONE)
+        self.assertEqual(job.upload.prediction, 'idli')
+        self.assertEqual(job.result['shape'], [224, 224, 3])
+        self.assertIsNone(job.model_input)
+
+    def test_failures_are_retried(self):
+        def broken(image):
+            raise RuntimeError("model crashed")
+
+        for attempt in range(jobs.JOB_MAX_ATTEMPTS):
+            job = jobs.claim_next('a')
+            self.assertEqual(job.pk, self.jobs[0].pk)
+            self.assertFalse(jobs.run_job(job, broken))
+        job.refresh_from_db()
+        self.assertEqual(job.status, InferenceJob.FAILED)
+        self.assertIn("model crashed", job.error)
+        self.assertEqual(jobs.claim_next('a').pk, self.jobs[1].pk)
+
+    def test_worker_heartbeat(self):
+        live = []
+
+        def predict(image):
+            live.append(jobs.live_workers())
+            return {'class': 'idli'}
+
+        self.assertEqual(jobs.run_worker(predict=predict, max_jobs=2, stop=threading.Event()), 2)
+        self.assertEqual(live, [1, 1])
+        # A worker that stopped cleanly is gone, one that died stops counting
+        self.assertEqual(jobs.live_workers(), 0)
+        InferenceWorker.objects.create(
+            name='dead', heartbeat=timezone.now() - timedelta(seconds=jobs.WORKER_HEARTBEAT_TIMEOUT + 1)
+        )
+        self.assertEqual(jobs.live_workers(), 0)
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """Concurrent predictions share model calls and each caller gets its own result"""
+
+    def test_concurrent_items_are_batched(self):
+        calls = []
+
+        def predict_batch(items):
+            calls.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait=0.5)
+        futures = [batcher.submit(item) for item in range(10)]
+        self.assertEqual([future.result(5) for future in futures], [item * 2 for item in range(10)])
+        self.assertEqual(calls, [4, 4, 2])
+
+    def test_errors_reach_every_caller_of_the_batch(self):
+        def predict_batch(items):
+            raise RuntimeError("model crashed")
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=2, max_wait=0.5)
+        futures = [batcher.submit(item) for item in range(2)]
+        for future in futures:
+            with self.assertRaisesMessage(RuntimeError, "model crashed"):
+                future.result(5)
+
+
+class DuplicateUploadTests(TestCase):
+    """Uploads of an already predicted photo reuse its prediction without the model"""
+
+    def setUp(self):
+        prediction_cache.clear()
+        self.user = User.objects.create(username='user')
+
+    def upload(self, image_hash):
+        return ImageUpload.objects.create(user=self.user, image='images/photo.jpg', image_hash=image_hash)
+
+    def test_exact_and_near_duplicates(self):
+        jobs.enqueue(self.upload('288c539312d8a849'), model_input=photo(224, 224))
+        job = jobs.claim_next('a')
+        jobs.run_job(job, lambda image: {'class': 'idli', 'confidence': 0.9})
+
+        # Served by the image_hash index when this process has not cached it
+        prediction_cache.clear()
+        exact = jobs.enqueue(self.upload('288c539312d8a849'))
+        self.assertEqual((exact.status, exact.result['class']), (InferenceJob.DONE, 'idli'))
+        self.assertEqual(exact.upload.prediction, 'idli')
+
+        near = jobs.enqueue(self.upload('288c539312d8a84b'))
+        self.assertEqual(near.status, InferenceJob.DONE)
+        different = jobs.enqueue(self.upload('d7' + '288c539312d8a8'))
+        self.assertEqual(different.status, InferenceJob.QUEUED)
+
+    def test_cache_is_bounded(self):
+        cache = PredictionCache(max_entries=2, max_distance=0)
+        for value in range(3):
+            cache.put(f'{value:016x}', {'class': value})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(f'{0:016x}'))
+        self.assertEqual(cache.get(f'{2:016x}'), {'class': 2})
+
+
+class ProcessUploadTests(SimpleTestCase):
+    """A phone-sized photo is decoded once into a capped stored copy and the model input"""
+
+    def test_large_photo(self):
+        original = photo(4032, 3024, 'JPEG')
+        processed = process_upload(SimpleUploadedFile('IMG_0001.HEIC.jpeg', original))
+
+        stored = processed.stored.read()
+        self.assertLessEqual(len(stored), STORE_MAX_BYTES)
+        self.assertTrue(processed.stored.name.endswith('.jpg'))
+        with Image.open(io.BytesIO(stored)) as image:
+            self.assertEqual((image.format, max(image.size)), ('JPEG', STORE_MAX_SIDE))
+
+        self.assertEqual(decode_model_input(processed.model_input).shape, (224, 224, 3))
+        self.assertLessEqual(hamming_distance(processed.image_hash, dhash(io.BytesIO(original))), 2)
+
+
+class InferenceWorkerSpawnTests(SimpleTestCase):
+    """run_inference_workers children must set Django up before importing the queue"""
+
+    def test_spawned_worker_starts(self):
+        import multiprocessing
+        from .management.commands.run_inference_workers import _worker
+
+        context = multiprocessing.get_context('spawn')
+        ready = context.Event()
+        # Set before the start, so the child returns before loading the model
+        # or touching the (development) database it was set up against
+        stop = context.Event()
+        stop.set()
+        worker = context.Process(target=_worker, args=(0, 1, ready, stop), daemon=True)
+        worker.start()
+        worker.join(60)
+        if worker.is_alive():
+            worker.terminate()
+            worker.join()
+        self.assertTrue(ready.is_set(), f"Spawned worker exited during startup (exit code {worker.exitcode})")
+        self.assertEqual(worker.exitcode, 0)
+
+
+class PredictionImportTests(SimpleTestCase):
+    """Web processes import prediction without loading the model's libraries"""
+
+    def test_no_model_libraries_on_import(self):
+        import subprocess
+        import sys
+        from django.conf import settings
+
+        code = (
+            "import sys, django; django.setup(); import image_api.prediction; "
+            "print(','.join(name for name in ('ultralytics', 'torch', 'cv2') if name in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'backend.settings'}
+        ).stdout
+        self.assertEqual(output.strip(), '')
+
+
+class NutrientTableTests(SimpleTestCase):
+    """The compiled nutrient table is served from the mapped file and matches the CSV"""
+
+    def test_compiled_matches_csv(self):
+        header, rows = read_csv(NUTRIENT_CSV_PATH)
+        from_csv = NutrientTable(header, rows)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'nutrient_values.bin')
+            compile_csv(NUTRIENT_CSV_PATH, path, NUTRIENT_TEXT_COLUMNS)
+            compiled = CatalogFile(path)
+            from_compiled = NutrientTable(compiled.header, compiled.rows, compiled.values)
+
+            # No per-process copy of the values
+            self.assertTrue(np.shares_memory(from_compiled.values, compiled.values))
+            self.assertEqual(len(from_compiled), len(from_csv))
+            for dish_name in from_csv.positions:
+                # Blank cells are NaN on both paths
+                np.testing.assert_equal(from_compiled.get(dish_name), from_csv.get(dish_name), err_msg=dish_name)
+
+        row = from_csv.get('aloo_gobi')
+        self.assertEqual((row['dish_name'], row['calories(kcal)']), ('aloo_gobi', 106.18))
+        self.assertIsNone(from_csv.get('missing'))
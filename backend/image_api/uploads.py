@@ -0,0 +1,119 @@
+"""
+Single-pass processing of uploaded photos
+
+An upload is decoded once, from the request's in-memory buffer, at the
+smallest JPEG scale still covering the stored size. From that one decode
+come the perceptual hash, the model input (already cropped to the model's
+input size and handed to the inference job as a small PNG, so workers
+never read the original) and the stored copy, re-encoded as a JPEG capped
+in both resolution and bytes instead of the 3-12 MB phone original.
+"""
+import io
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .image_hash import dhash
+from .model_registry import DEFAULT_IMAGE_SIZE
+
+# Longest side in pixels of the stored copy
+STORE_MAX_SIDE = getattr(settings, 'IMAGE_STORE_MAX_SIDE', 1280)
+
+# JPEG quality of the stored copy, lowered in steps until it fits STORE_MAX_BYTES
+STORE_QUALITY = getattr(settings, 'IMAGE_STORE_QUALITY', 85)
+STORE_MIN_QUALITY = 50
+STORE_MAX_BYTES = getattr(settings, 'IMAGE_STORE_MAX_BYTES', 512 * 1024)
+
+# Side of the square image the model is run on
+MODEL_INPUT_SIZE = getattr(settings, 'IMAGE_MODEL_INPUT_SIZE', DEFAULT_IMAGE_SIZE)
+
+
+class ProcessedUpload:
+    """
+    Everything derived from one decode of an uploaded photo
+
+    Attributes:
+    - stored: ContentFile of the size-capped JPEG to save as the upload
+    - model_input: PNG bytes of the image at the model's input size
+    - image_hash: Perceptual hash of the photo
+    """
+
+    def __init__(self, stored, model_input, image_hash):
+        self.stored = stored
+        self.model_input = model_input
+        self.image_hash = image_hash
+
+
+def decode_upload(upload, max_side=STORE_MAX_SIDE):
+    """
+    Decode an uploaded file to an upright RGB image no larger than needed
+
+    Parameters:
+    - upload: UploadedFile (or any file object) holding the photo
+    - max_side: Longest side the caller will keep
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    # JPEG decoding at 1/2, 1/4 or 1/8 scale skips most of the work for photos
+    # far larger than max_side
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    return image.convert('RGB')
+
+
+def encode_stored(image, max_side=STORE_MAX_SIDE, max_bytes=STORE_MAX_BYTES):
+    """JPEG bytes of image shrunk to max_side, at the best quality within max_bytes"""
+    if max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    quality = STORE_QUALITY
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=quality, optimize=True)
+        if buffer.tell() <= max_bytes or quality <= STORE_MIN_QUALITY:
+            return buffer.getvalue()
+        quality -= 10
+
+
+def model_input_image(image, size=MODEL_INPUT_SIZE):
+    """Image resized on its short side and center-cropped to size x size, as the classifier sees it"""
+    return ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+
+
+def encode_model_input(image):
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def model_array(image):
+    """BGR array of an RGB image, the channel order cv2.imread gives the model"""
+    return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+
+def decode_model_input(data):
+    """BGR array of a model input encoded by process_upload"""
+    with Image.open(io.BytesIO(data)) as image:
+        return model_array(image.convert('RGB'))
+
+
+def load_model_input(image_file, size=MODEL_INPUT_SIZE):
+    """BGR model input of an already stored image, for uploads queued without one"""
+    with image_file.open('rb'):
+        image = decode_upload(image_file, max_side=size)
+    return model_array(model_input_image(image, size))
+
+
+def process_upload(upload):
+    """Decode an uploaded photo once and derive its stored copy, model input and hash"""
+    image = decode_upload(upload)
+    stored = encode_stored(image)
+    name = f"{os.path.splitext(os.path.basename(upload.name or 'upload'))[0]}.jpg"
+    return ProcessedUpload(
+        stored=ContentFile(stored, name=name),
+        model_input=encode_model_input(model_input_image(image)),
+        image_hash=dhash(image),
+    )
@@ -1,10 +1,12 @@
 # # data_api/urls.py
 
 # from django.urls import path
-# from .views import ImageUploadView, PredictionFeedbackView, UserImageListView
+# from .views import ImageUploadView, PredictionFeedbackView, UserImageListView, ModelStatusView, InferenceJobView
 
 # urlpatterns = [
 #     path('upload/', ImageUploadView.as_view(), name='image-upload'),
+#     path('jobs/<uuid:pk>/', InferenceJobView.as_view(), name='inference-job'),
 #     path('feedback/', PredictionFeedbackView.as_view(), name='prediction-feedback'),
 #     path('my-images/', UserImageListView.as_view(), name='user-image-list'),
+#     path('ready/', ModelStatusView.as_view(), name='model-status'),
 # ]
\ No newline at end of file
@@ -1,13 +1,17 @@
 '''from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from .models import ImageUpload, PredictionFeedback
+from rest_framework.reverse import reverse
+from django.shortcuts import get_object_or_404
+from .models import ImageUpload, InferenceJob, PredictionFeedback
 from .serializers import ImageUploadSerializer, PredictionFeedbackSerializer
-from .prediction import predict_image_content, get_nutrition_by_dish
+from .prediction import get_nutrition_by_dish
+from .jobs import enqueue, live_workers
+from .uploads import process_upload
 from .searchNutrients import get_row_as_json
 
 class ImageUploadView(generics.CreateAPIView):
-    """API endpoint for uploading and processing images"""
+    """API endpoint for uploading images and queueing their prediction"""
     serializer_class = ImageUploadSerializer
     parser_classes = (MultiPartParser, FormParser)
     permission_classes = [permissions.IsAuthenticated]
@@ -16,27 +20,50 @@ class ImageUploadView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Save the image upload with the authenticated user
-        instance = serializer.save(user=request.user)
+        # Decode the photo once from the request; only a size-capped copy is stored
+        processed = process_upload(serializer.validated_data['image'])
         
-        # Get the path to the saved image
-        image_path = instance.image.path
+        # Save the image upload with the authenticated user and its perceptual hash
+        instance = serializer.save(user=request.user, image=processed.stored, image_hash=processed.image_hash)
         
-        # Use the prediction service to analyze the image
-        prediction_result = predict_image_content(image_path)
+        # Inference runs on the workers of run_inference_workers, unless the
+        # same photo was predicted before
+        job = enqueue(instance, model_input=processed.model_input)
         
-        # Update the instance with the prediction
-        instance.prediction = prediction_result['class']
-        instance.save()
-        
-        # Return the updated instance data
-        response_serializer = self.get_serializer(instance)
-        response_data = response_serializer.data
+        response_data = self.get_serializer(instance).data
         response_data.update({
-            'prediction_detail': prediction_result
+            'job_id': str(job.id),
+            'status': job.status,
+            'status_url': reverse('inference-job', kwargs={'pk': job.id}, request=request),
         })
-        
-        return Response(response_data, status=status.HTTP_201_CREATED)
+        if job.status == InferenceJob.DONE:
+            response_data['prediction_detail'] = job.result
+            return Response(response_data, status=status.HTTP_201_CREATED)
+        return Response(response_data, status=status.HTTP_202_ACCEPTED)
+
+class InferenceJobView(generics.GenericAPIView):
+    """API endpoint to poll the prediction job of an uploaded image"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(InferenceJob.objects.select_related('upload'), pk=pk, upload__user=request.user)
+        response_data = {
+            'job_id': str(job.id),
+            'image_id': job.upload_id,
+            'status': job.status,
+            'attempts': job.attempts,
+            'created': job.created,
+            'finished': job.finished,
+        }
+        if job.status == InferenceJob.DONE:
+            response_data['prediction'] = job.upload.prediction
+            response_data['prediction_detail'] = job.result
+            return Response(response_data)
+        if job.status == InferenceJob.FAILED:
+            response_data['error'] = "Prediction failed"
+            return Response(response_data)
+        # Still queued or running, poll again
+        return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
 class PredictionFeedbackView(generics.CreateAPIView):
     """API endpoint for submitting feedback on predictions"""
@@ -61,4 +88,17 @@ class UserImageListView(generics.ListAPIView):
     
     def get_queryset(self):
         return ImageUpload.objects.filter(user=self.request.user).order_by('-timestamp')
+
+class ModelStatusView(generics.GenericAPIView):
+    """API endpoint reporting whether inference workers with a loaded model are running"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        # Web processes do not load the model; the workers' heartbeats tell
+        # whether uploads will be predicted
+        workers = live_workers()
+        return Response(
+            {'ready': workers > 0, 'workers': workers},
+            status=status.HTTP_200_OK if workers else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
         '''
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Recording changes to the objects served by /sync/pull/
+
+Single saves and deletes are picked up by the signal receivers below;
+bulk inserts, which send no signals, call record_changes directly.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from food.models import DailyGoal, FoodConsumption, WaterIntake
+from users.models import UserProfile
+from .models import Change
+
+# Synced models with an owning user, by change kind
+KIND_MODELS = {
+    'daily_goal': DailyGoal,
+    'water': WaterIntake,
+    'food': FoodConsumption,
+}
+MODEL_KINDS = {model: kind for kind, model in KIND_MODELS.items()}
+
+
+def record_changes(user_id, kind, object_ids, deleted=False):
+    """Move objects of a user to the head of the change log"""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    with transaction.atomic():
+        Change.objects.filter(user_id=user_id, kind=kind, object_id__in=object_ids).delete()
+        Change.objects.bulk_create([
+            Change(user_id=user_id, kind=kind, object_id=object_id, deleted=deleted)
+            for object_id in object_ids
+        ])
+
+
+@receiver(post_save, sender=User)
+def record_user_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes(instance.pk, 'user', [instance.pk])
+
+
+@receiver(post_save, sender=UserProfile)
+def record_profile_change(sender, instance, raw=False, **kwargs):
+    # The profile is served nested in the user
+    if not raw:
+        record_changes(instance.user_id, 'user', [instance.user_id])
+
+
+@receiver(post_save, sender=DailyGoal)
+@receiver(post_save, sender=WaterIntake)
+@receiver(post_save, sender=FoodConsumption)
+def record_entry_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes(instance.user_id, MODEL_KINDS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=DailyGoal)
+@receiver(post_delete, sender=WaterIntake)
+@receiver(post_delete, sender=FoodConsumption)
+def record_entry_delete(sender, instance, origin=None, **kwargs):
+    # Nothing to record when the entry goes with its deleted user
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model is User:
+        return
+    record_changes(instance.user_id, MODEL_KINDS[sender], [instance.pk], deleted=True)
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def log_existing_objects(apps, schema_editor):
+    """Give every existing synced object a change row so a first pull returns it"""
+    Change = apps.get_model('sync', 'Change')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    changes = [
+        Change(user_id=user_id, kind='user', object_id=user_id)
+        for user_id in User.objects.values_list('id', flat=True).iterator()
+    ]
+    for kind, model_name in (('daily_goal', 'DailyGoal'), ('water', 'WaterIntake'), ('food', 'FoodConsumption')):
+        model = apps.get_model('food', model_name)
+        changes.extend(
+            Change(user_id=user_id, kind=kind, object_id=object_id)
+            for object_id, user_id in model.objects.values_list('id', 'user_id').iterator()
+        )
+    Change.objects.bulk_create(changes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('food', '0005_foodconsumption_client_id_waterintake_client_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'User'), ('daily_goal', 'Daily goal'), ('water', 'Water intake'), ('food', 'Food consumption')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'object_id'), name='unique_sync_change'),
+        ),
+        migrations.RunPython(log_existing_objects, migrations.RunPython.noop),
+    ]
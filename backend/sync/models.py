@@ -0,0 +1,33 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+class Change(models.Model):
+    """
+    Latest change to one synced object of a user
+
+    Each write replaces the object's previous row, so ids only grow and the
+    highest id a client has seen is its sync cursor. Deleted objects keep a
+    row with deleted set, the tombstone.
+    """
+    KIND_CHOICES = [
+        ('user', 'User'),
+        ('daily_goal', 'Daily goal'),
+        ('water', 'Water intake'),
+        ('food', 'Food consumption'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_changes')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    timestamp = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'object_id'], name='unique_sync_change'),
+        ]
+    
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"{self.user.username}'s {self.kind} {self.object_id} {action}"
@@ -0,0 +1,205 @@
+import uuid
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from food.aggregates import DEFAULT_DAILY_GOAL
+from food.models import DailyGoal, DailyNutritionRollup, FoodConsumption, WaterIntake
+from .models import Change
+from .views import _insert_new
+
+
+class SyncPushIdempotencyTests(TestCase):
+    """Every pushed event is applied at most once, however often it is replayed"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food_id = str(uuid.uuid4())
+        self.water_id = str(uuid.uuid4())
+        self.events = [
+            {'id': self.food_id, 'type': 'food', 'food_index': 1, 'calories': 300, 'timestamp': '2025-01-10T08:00:00Z'},
+            {'id': self.water_id, 'type': 'water', 'amount': 250, 'timestamp': '2025-01-10T09:00:00Z'},
+        ]
+
+    def push(self, events):
+        response = self.client.post('/sync/push/', {'events': events}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def rollups(self):
+        return list(DailyNutritionRollup.objects.filter(user=self.user).values())
+
+    def test_replayed_batch(self):
+        data = self.push(self.events)
+        self.assertEqual((data['created'], data['duplicate'], data['invalid']), (2, 0, 0))
+        rollups = self.rollups()
+        self.assertEqual(rollups[0]['calories'], 300)
+        self.assertEqual(rollups[0]['water'], 250)
+        changes = Change.objects.count()
+
+        data = self.push(self.events)
+        self.assertEqual((data['created'], data['duplicate'], data['invalid']), (0, 2, 0))
+        self.assertEqual([result['status'] for result in data['results']], ['duplicate', 'duplicate'])
+        self.assertEqual(FoodConsumption.objects.count(), 1)
+        self.assertEqual(WaterIntake.objects.count(), 1)
+        self.assertEqual(self.rollups(), rollups)
+        self.assertEqual(Change.objects.count(), changes)
+
+    def test_repeated_id_in_one_batch(self):
+        data = self.push([self.events[1], dict(self.events[1], amount=500)])
+        self.assertEqual([result['status'] for result in data['results']], ['created', 'duplicate'])
+        self.assertEqual(WaterIntake.objects.get().amount, 250)
+        self.assertEqual(self.rollups()[0]['water'], 250)
+
+    def test_invalid_events_do_not_block_valid_ones(self):
+        data = self.push([
+            {'id': 'not-a-uuid', 'type': 'water', 'amount': 250},
+            {'id': str(uuid.uuid4()), 'type': 'soda', 'amount': 250},
+            {'id': str(uuid.uuid4()), 'type': 'water', 'amount': -1},
+            {'id': str(uuid.uuid4()), 'type': 'food', 'food_index': 10 ** 6},
+            *self.events,
+        ])
+        self.assertEqual(
+            [result['status'] for result in data['results']],
+            ['invalid', 'invalid', 'invalid', 'invalid', 'created', 'created']
+        )
+        self.assertEqual(data['results'][3]['error'], "Food not found")
+        self.assertEqual(FoodConsumption.objects.count(), 1)
+        self.assertEqual(WaterIntake.objects.count(), 1)
+
+    def test_invalid_nutrient_override_only_rejects_its_event(self):
+        data = self.push([
+            {'id': str(uuid.uuid4()), 'type': 'food', 'food_index': 1, 'calories': 'NaN'},
+            {'id': str(uuid.uuid4()), 'type': 'food', 'food_index': 1, 'fat': -5},
+            *self.events,
+        ])
+        self.assertEqual(
+            [result['status'] for result in data['results']], ['invalid', 'invalid', 'created', 'created']
+        )
+        self.assertEqual(data['results'][0]['error'], "calories must be a non-negative number")
+        self.assertEqual(FoodConsumption.objects.get().calories, 300)
+
+    def test_rows_inserted_by_a_racing_replay_are_skipped(self):
+        # A replay that inserted one of the events after this push checked for them
+        WaterIntake.objects.create(user=self.user, amount=250, client_id=self.water_id)
+        entries = [
+            WaterIntake(user=self.user, amount=250, client_id=uuid.UUID(self.water_id)),
+            WaterIntake(user=self.user, amount=500, client_id=uuid.uuid4()),
+        ]
+        inserted = _insert_new(WaterIntake, entries)
+        self.assertEqual([entry.amount for entry in inserted], [500])
+        self.assertIsNotNone(inserted[0].pk)
+        self.assertEqual(WaterIntake.objects.count(), 2)
+
+
+class SyncPullTests(TestCase):
+    """Pulls page through the change log in cursor order, with tombstones for deletes"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.cursor = self.pull()['cursor']
+
+    def pull(self, since=None):
+        response = self.client.get('/sync/pull/', {'since': since} if since is not None else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def changes(self, data):
+        return [(change['type'], change['id'], change['op']) for change in data['changes']]
+
+    def water(self, amount=250):
+        return WaterIntake.objects.create(user=self.user, amount=amount)
+
+    def food(self):
+        return FoodConsumption.objects.create(
+            user=self.user, food_name='Rice', calories=130, protein=2.7, carbohydrates=28, fat=0.3
+        )
+
+    def test_first_pull_has_the_user(self):
+        data = self.pull()
+        self.assertEqual(self.changes(data), [('user', self.user.pk, 'upsert')])
+        self.assertEqual(data['changes'][0]['data']['username'], 'user')
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.client.get('/sync/pull/?since=x').status_code, 400)
+        self.assertEqual(self.client.get('/sync/pull/?since=-1').status_code, 400)
+
+    def test_cursor_advances(self):
+        water = self.water()
+        data = self.pull(self.cursor)
+        self.assertEqual(self.changes(data), [('water', water.pk, 'upsert')])
+        self.assertEqual(data['changes'][0]['data']['amount'], 250)
+        self.assertGreater(int(data['cursor']), int(self.cursor))
+        self.assertEqual(self.pull(data['cursor']), {'cursor': data['cursor'], 'has_more': False, 'changes': []})
+
+    def test_has_more_pages(self):
+        entries = [self.water(), self.food(), self.water(), self.food(), self.water()]
+        DailyGoal.objects.create(user=self.user, **DEFAULT_DAILY_GOAL)
+        seen = []
+        cursor = self.cursor
+        with mock.patch('sync.views.MAX_PULL_CHANGES', 2):
+            while True:
+                data = self.pull(cursor)
+                self.assertLessEqual(len(data['changes']), 2)
+                seen += self.changes(data)
+                cursor = data['cursor']
+                if not data['has_more']:
+                    break
+        self.assertEqual(
+            [(kind, object_id) for kind, object_id, _ in seen],
+            [('water' if isinstance(entry, WaterIntake) else 'food', entry.pk) for entry in entries]
+            + [('daily_goal', DailyGoal.objects.get().pk)]
+        )
+
+    def test_delete_leaves_a_tombstone(self):
+        kept, deleted = self.water(), self.water()
+        data = self.pull(self.cursor)
+        deleted_pk = deleted.pk
+        deleted.delete()
+        self.assertEqual(self.changes(self.pull(data['cursor'])), [('water', deleted_pk, 'delete')])
+        # A client pulling from scratch only sees the tombstone
+        self.assertEqual(
+            self.changes(self.pull(self.cursor)), [('water', kept.pk, 'upsert'), ('water', deleted_pk, 'delete')]
+        )
+
+    def test_upsert_of_object_deleted_later_is_skipped(self):
+        water = self.water()
+        # Deleted without signals, between logging the change and the pull
+        WaterIntake.objects.filter(pk=water.pk)._raw_delete('default')
+        data = self.pull(self.cursor)
+        self.assertEqual(data['changes'], [])
+        self.assertGreater(int(data['cursor']), int(self.cursor))
+
+    def test_user_delete_cascade_records_nothing(self):
+        other = User.objects.create(username='other')
+        other_water = WaterIntake.objects.create(user=other, amount=250)
+        self.water()
+        self.food()
+        self.user.delete()
+        self.assertFalse(Change.objects.filter(user_id=self.user.pk).exists())
+        self.assertTrue(Change.objects.filter(user=other, kind='water', object_id=other_water.pk).exists())
+
+    def test_interleaved_writes(self):
+        first, second = self.water(), self.food()
+        data = self.pull(self.cursor)
+        self.assertEqual(self.changes(data), [('water', first.pk, 'upsert'), ('food', second.pk, 'upsert')])
+
+        # Re-saving the newest object replaces the change row holding the
+        # client's cursor; its new row must still sort after that cursor
+        second.calories = 200
+        second.save()
+        third = self.water()
+        first.amount = 500
+        first.save()
+        data = self.pull(data['cursor'])
+        self.assertEqual(
+            self.changes(data),
+            [('food', second.pk, 'upsert'), ('water', third.pk, 'upsert'), ('water', first.pk, 'upsert')]
+        )
+        self.assertEqual(data['changes'][0]['data']['calories'], 200)
+        self.assertEqual(data['changes'][2]['data']['amount'], 500)
@@ -0,0 +1,239 @@
+import math
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+
+from food.meals import build_consumptions, parse_meal_item
+from food.models import FoodConsumption, WaterIntake
+from food.rollups import record_food, record_water
+from food.streaks import record_actions
+from food.serializers import DailyGoalSerializer, FoodConsumptionSerializer, WaterIntakeSerializer
+from users.serializers import UserSerializer
+from .changes import KIND_MODELS, record_changes
+from .models import Change
+
+# Most events accepted by a single push, about a week of heavy offline use
+MAX_PUSH_EVENTS = 1000
+
+EVENT_TYPES = ('food', 'water')
+
+# Most changes returned by a single pull
+MAX_PULL_CHANGES = 500
+
+# Serializers of the synced objects, by change kind
+KIND_SERIALIZERS = {
+    'user': UserSerializer,
+    'daily_goal': DailyGoalSerializer,
+    'water': WaterIntakeSerializer,
+    'food': FoodConsumptionSerializer,
+}
+
+
+def _parse_event(event):
+    """Return (type, timestamp) of a pushed event"""
+    if not isinstance(event, dict):
+        raise ValueError("Event must be an object")
+    event_type = event.get('type')
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(EVENT_TYPES)}")
+
+    timestamp = event.get('timestamp')
+    if timestamp is None:
+        timestamp = timezone.now()
+    else:
+        try:
+            timestamp = parse_datetime(str(timestamp))
+        except ValueError:
+            timestamp = None
+        if timestamp is None:
+            raise ValueError("timestamp must be an ISO 8601 datetime")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+    return event_type, timestamp
+
+
+def _parse_water_amount(event):
+    try:
+        amount = float(event.get('amount'))
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number")
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValueError("amount must be a positive number")
+    return amount
+
+
+def _insert_new(model, entries):
+    """
+    Insert entries with a client_id, skipping ones another request inserted first
+
+    Returns:
+    - The entries inserted by this call, with their primary keys set
+    """
+    if not entries:
+        return []
+    try:
+        with transaction.atomic():
+            inserted = model.objects.bulk_create(entries, batch_size=500)
+    except IntegrityError:
+        pass
+    else:
+        return _with_pks(model, inserted)
+    # A concurrent replay inserted some of them; find out which row by row
+    inserted = []
+    for entry in entries:
+        entry.pk = None
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([entry])
+        except IntegrityError:
+            continue
+        inserted.append(entry)
+    return _with_pks(model, inserted)
+
+
+def _with_pks(model, entries):
+    """Fill in primary keys on backends that do not return them from bulk inserts"""
+    missing = {entry.client_id: entry for entry in entries if entry.pk is None}
+    if missing:
+        for client_id, pk in model.objects.filter(
+            user_id=entries[0].user_id, client_id__in=list(missing)
+        ).values_list('client_id', 'id'):
+            missing[client_id].pk = pk
+    return entries
+
+
+class SyncPushView(generics.GenericAPIView):
+    """API endpoint to ingest a batch of offline food and water events exactly once"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        events = request.data.get('events')
+        if not isinstance(events, list) or not events:
+            return Response({"detail": "events must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > MAX_PUSH_EVENTS:
+            return Response(
+                {"detail": f"At most {MAX_PUSH_EVENTS} events can be pushed at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate every event; invalid ones are reported without blocking the rest
+        results = []
+        food_items = {}
+        timestamps = {}
+        water = {}
+        for event in events:
+            try:
+                client_id = uuid.UUID(str(event.get('id') if isinstance(event, dict) else None))
+            except ValueError:
+                results.append({'id': None, 'status': 'invalid', 'error': "id must be a UUID"})
+                continue
+            result = {'id': str(client_id), 'status': 'created'}
+            results.append(result)
+            if client_id in food_items or client_id in water:
+                result['status'] = 'duplicate'
+                continue
+            try:
+                event_type, timestamps[client_id] = _parse_event(event)
+                if event_type == 'food':
+                    food_items[client_id] = parse_meal_item(event)
+                else:
+                    water[client_id] = WaterIntake(
+                        user=request.user, amount=_parse_water_amount(event),
+                        timestamp=timestamps[client_id], client_id=client_id
+                    )
+            except ValueError as e:
+                result.update(status='invalid', error=str(e))
+
+        # Resolve all foods in one pass over the catalog
+        food, errors = build_consumptions(
+            request.user, food_items,
+            timestamp=timestamps, client_id={client_id: client_id for client_id in food_items}
+        )
+
+        with transaction.atomic():
+            existing = set(FoodConsumption.objects.filter(
+                user=request.user, client_id__in=list(food)
+            ).values_list('client_id', flat=True))
+            existing.update(WaterIntake.objects.filter(
+                user=request.user, client_id__in=list(water)
+            ).values_list('client_id', flat=True))
+
+            # Replays racing this one make the unique (user, client_id)
+            # constraints drop rows; only rows inserted here are counted
+            new_food = _insert_new(FoodConsumption, [entry for client_id, entry in food.items() if client_id not in existing])
+            new_water = _insert_new(WaterIntake, [entry for client_id, entry in water.items() if client_id not in existing])
+            # bulk_create sends no signals, so update the daily rollups,
+            # streak and sync log here
+            record_food(new_food)
+            record_water(new_water)
+            record_actions(request.user.pk, [entry.timestamp for entry in new_food + new_water])
+            record_changes(request.user.pk, 'food', [entry.pk for entry in new_food])
+            record_changes(request.user.pk, 'water', [entry.pk for entry in new_water])
+        inserted = {entry.client_id for entry in new_food + new_water}
+
+        for result in results:
+            if result['status'] != 'created':
+                continue
+            client_id = uuid.UUID(result['id'])
+            if client_id in errors:
+                result.update(status='invalid', error=errors[client_id])
+            elif client_id not in inserted:
+                result['status'] = 'duplicate'
+
+        counts = {key: 0 for key in ('created', 'duplicate', 'invalid')}
+        for result in results:
+            counts[result['status']] += 1
+        return Response({'results': results, **counts})
+
+
+class SyncPullView(generics.GenericAPIView):
+    """API endpoint returning the user's objects changed since a sync cursor"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get('since') or 0)
+        except ValueError:
+            since = -1
+        if since < 0:
+            return Response({"detail": "since must be a cursor returned by a previous pull"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One extra row tells whether more changes follow
+        changes = list(Change.objects.filter(
+            user=request.user, id__gt=since
+        ).order_by('id').values('id', 'kind', 'object_id', 'deleted')[:MAX_PULL_CHANGES + 1])
+        has_more = len(changes) > MAX_PULL_CHANGES
+        changes = changes[:MAX_PULL_CHANGES]
+
+        # Fetch the current state of changed objects, one query per kind
+        objects = {}
+        for kind in KIND_SERIALIZERS:
+            ids = [change['object_id'] for change in changes if change['kind'] == kind and not change['deleted']]
+            if not ids:
+                continue
+            if kind == 'user':
+                objects[kind] = {request.user.pk: request.user}
+            else:
+                objects[kind] = KIND_MODELS[kind].objects.filter(user=request.user).in_bulk(ids)
+
+        results = []
+        for change in changes:
+            kind, object_id = change['kind'], change['object_id']
+            if change['deleted']:
+                results.append({'type': kind, 'id': object_id, 'op': 'delete'})
+                continue
+            instance = objects[kind].get(object_id)
+            if instance is None:
+                # Deleted after this change was logged; its tombstone comes later
+                continue
+            data = KIND_SERIALIZERS[kind](instance, context={'request': request}).data
+            if kind in EVENT_TYPES:
+                data['client_id'] = str(instance.client_id) if instance.client_id else None
+            results.append({'type': kind, 'id': object_id, 'op': 'upsert', 'data': data})
+
+        cursor = changes[-1]['id'] if changes else since
+        return Response({'cursor': str(cursor), 'has_more': has_more, 'changes': results})
@@ -0,0 +1,107 @@
+"""
+Streaming export of everything a user has logged
+
+Records are read with chunked .iterator() querysets and serialized one at a
+time into buffered chunks, so memory use does not grow with the size of the
+history being exported.
+"""
+import csv
+import io
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from food.models import DailyGoal, FoodConsumption, WaterIntake
+from image_api.models import ImageUpload
+from .models import UserDetails
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 500
+
+# Bytes collected before a chunk is handed to the response
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# (record type, model, exported fields) in export order
+EXPORT_SECTIONS = (
+    ('user_details', UserDetails,
+     ('age', 'height', 'current_weight', 'gender', 'activity_level', 'goal_weight')),
+    ('daily_goal', DailyGoal, ('calories', 'protein', 'carbohydrates', 'fat')),
+    ('food', FoodConsumption,
+     ('id', 'timestamp', 'food_index', 'food_id', 'food_name', 'calories', 'protein', 'carbohydrates', 'fat')),
+    ('water', WaterIntake, ('id', 'timestamp', 'amount')),
+    ('image', ImageUpload, ('id', 'timestamp', 'image', 'prediction', 'prediction_id')),
+)
+
+# Union of the fields of every section, the columns of the CSV export
+CSV_COLUMNS = ('record_type',) + tuple(dict.fromkeys(
+    field for _, _, fields in EXPORT_SECTIONS for field in fields
+))
+
+
+def export_records(user):
+    """Yield (record type, values) for every exported row of user, oldest first"""
+    for record_type, model, fields in EXPORT_SECTIONS:
+        queryset = model.objects.filter(user=user).values(*fields)
+        if 'timestamp' in fields:
+            queryset = queryset.order_by('timestamp', 'id')
+        for values in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield record_type, values
+
+
+def _buffered(pieces):
+    """Join small strings into chunks of about EXPORT_BUFFER_SIZE bytes"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def ndjson_chunks(records):
+    """Encode records as newline-delimited JSON objects with a record_type key"""
+    encoder = DjangoJSONEncoder()
+    return _buffered(
+        encoder.encode({'record_type': record_type, **_isoformat_dates(values)}) + '\n'
+        for record_type, values in records
+    )
+
+
+def csv_chunks(records):
+    """Encode records as one CSV over CSV_COLUMNS, blank where a field does not apply"""
+    def lines():
+        line = io.StringIO()
+        writer = csv.DictWriter(line, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for record_type, values in records:
+            writer.writerow({'record_type': record_type, **_isoformat_dates(values)})
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+        yield line.getvalue()
+    return _buffered(lines())
+
+
+def _isoformat_dates(values):
+    # Full precision, unlike DjangoJSONEncoder which drops microseconds
+    return {
+        field: value.isoformat() if hasattr(value, 'isoformat') else value
+        for field, value in values.items()
+    }
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of byte chunks without holding the whole stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,3 +1,65 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from food.models import DailyGoal, FoodConsumption, WaterIntake
+from .models import UserDetails
+from .views import DASHBOARD_QUERY_BUDGET
+
+
+class DashboardQueryBudgetTests(TestCase):
+    """The dashboard must stay within DASHBOARD_QUERY_BUDGET queries however much is logged"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user')
+        now = timezone.now()
+        for i in range(20):
+            FoodConsumption.objects.create(
+                user=cls.user, food_name='Rice', calories=130, protein=2.7, carbohydrates=28, fat=0.3
+            )
+            WaterIntake.objects.create(user=cls.user, amount=250)
+        # Yesterday's entries must not show up
+        FoodConsumption.objects.create(
+            user=cls.user, food_name='Dal', calories=100, protein=7, carbohydrates=15, fat=1,
+            timestamp=now - timedelta(days=1, hours=1)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_dashboard(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/users/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(captured.captured_queries), DASHBOARD_QUERY_BUDGET,
+            "\n".join(query['sql'] for query in captured.captured_queries)
+        )
+        return response.data
+
+    def test_without_details_or_goal(self):
+        data = self.get_dashboard()
+        self.assertIsNone(data['details'])
+        self.assertEqual(data['goal']['calories'], 2000)
+        self.assertEqual(len(data['food']), 20)
+        self.assertEqual(len(data['water']), 20)
+        self.assertEqual(data['totals']['items'], 20)
+        self.assertAlmostEqual(data['totals']['water'], 5000)
 
-# Create your tests here.
+    def test_with_details_and_goal(self):
+        UserDetails.objects.create(
+            user=self.user, age=30, height=180, current_weight=80, gender='M',
+            activity_level='medium', goal_weight=75
+        )
+        DailyGoal.objects.create(user=self.user, calories=2500, protein=120, carbohydrates=300, fat=80)
+        data = self.get_dashboard()
+        self.assertEqual(data['details']['age'], 30)
+        self.assertEqual(data['goal']['calories'], 2500)
+        self.assertAlmostEqual(data['remaining']['calories'], 2500 - 20 * 130)
@@ -1,8 +1,10 @@
 from django.urls import path, re_path
-from .views import UserDetailView, UserProfileView, UserDetailsView
+from .views import UserDetailView, UserProfileView, UserDetailsView, UserExportView, DashboardView
 
 urlpatterns = [
     path('me/', UserDetailView.as_view(), name='user-detail'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
     re_path(r'^userDetails/?$', UserDetailsView.as_view(), name='user-details'),
+    path('export/', UserExportView.as_view(), name='user-export'),
+    path('dashboard/', DashboardView.as_view(), name='user-dashboard'),
 ]
\ No newline at end of file
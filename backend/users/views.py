@@ -1,7 +1,9 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from django.contrib.auth.models import User
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from datetime import datetime, time, timedelta
 from .models import UserProfile, UserDetails
 from .serializers import UserSerializer, UserProfileSerializer, UserDetailsSerializer
 from .caloriecalc import calculate_daily_goals
@@ -11,8 +13,20 @@ from pathlib import Path
 # Add the food app to the Python path
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(BASE_DIR))
-from food.models import DailyGoal
-from food.serializers import DailyGoalSerializer
+from food.models import DailyGoal, FoodConsumption, WaterIntake
+from food.serializers import DailyGoalSerializer, FoodConsumptionSerializer, WaterIntakeSerializer
+from food.aggregates import DEFAULT_DAILY_GOAL, NUTRIENT_TOTALS, daily_totals
+from .export import export_records, ndjson_chunks, csv_chunks, gzip_chunks
+
+# Most SQL queries the dashboard may run, authentication aside; enforced by
+# users.tests.DashboardQueryBudgetTests
+DASHBOARD_QUERY_BUDGET = 4
+
+# Export encodings: chunk encoder, content type and file extension
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_chunks, 'application/x-ndjson', 'ndjson'),
+    'csv': (csv_chunks, 'text/csv; charset=utf-8', 'csv'),
+}
 
 class UserDetailView(generics.RetrieveAPIView):
     """API endpoint to get user details"""
@@ -129,4 +143,61 @@ class UserDetailsView(generics.GenericAPIView):
         })
         
     def perform_update(self, serializer):
-        serializer.save()
\ No newline at end of file
+        serializer.save()
+
+class UserExportView(generics.GenericAPIView):
+    """API endpoint streaming the user's full history as NDJSON or CSV"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson').lower()
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true')
+        
+        encode, content_type, extension = EXPORT_FORMATS[output]
+        chunks = encode(export_records(request.user))
+        filename = f"calwatch-{request.user.username}-{timezone.localdate().isoformat()}.{extension}"
+        if compress:
+            chunks = gzip_chunks(chunks)
+            content_type = 'application/gzip'
+            filename += '.gz'
+        
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class DashboardView(generics.GenericAPIView):
+    """API endpoint with everything the app shows on startup, in DASHBOARD_QUERY_BUDGET queries"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        # 1: the user with profile, details and goals
+        user = User.objects.select_related('profile', 'details', 'daily_goal').get(pk=request.user.pk)
+        details = user.details if hasattr(user, 'details') else None
+        goal = user.daily_goal if hasattr(user, 'daily_goal') else None
+        
+        # 2: today's totals from the daily rollup
+        today = timezone.localdate()
+        totals = daily_totals(user, today, today)[today]
+        goal_values = {field: getattr(goal, field) for field in NUTRIENT_TOTALS} if goal else dict(DEFAULT_DAILY_GOAL)
+        
+        # 3 and 4: today's entries, read off the (user, timestamp) indexes
+        start = timezone.make_aware(datetime.combine(today, time.min))
+        end = start + timedelta(days=1)
+        food = FoodConsumption.objects.filter(user=user, timestamp__gte=start, timestamp__lt=end).order_by('timestamp', 'id')
+        water = WaterIntake.objects.filter(user=user, timestamp__gte=start, timestamp__lt=end).order_by('timestamp', 'id')
+        
+        return Response({
+            'user': UserSerializer(user, context={'request': request}).data,
+            'details': UserDetailsSerializer(details).data if details else None,
+            'goal': DailyGoalSerializer(goal).data if goal else goal_values,
+            'date': today.isoformat(),
+            'totals': totals,
+            'remaining': {field: goal_values[field] - totals[field] for field in NUTRIENT_TOTALS},
+            'food': FoodConsumptionSerializer(food, many=True).data,
+            'water': WaterIntakeSerializer(water, many=True).data
+        })